@@ -0,0 +1,50 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+READ_METHODS = frozenset(('GET', 'HEAD', 'OPTIONS'))
+READ_ACTIONS = frozenset(('list', 'retrieve', 'feed'))
+
+
+def async_read_view(view):
+    """Асинхронная обертка над представлением DRF для ASGI.
+
+    Django 3.2 выполняет синхронные представления под ASGI в одном
+    потоке на процесс. Чтение здесь уходит в пул потоков
+    (thread_sensitive=False), поэтому медленные запросы к базе
+    не блокируют остальные; ответ рендерится в том же потоке, после
+    чего соединения потока закрываются по CONN_MAX_AGE. Изменяющие
+    запросы выполняются как обычно, в общем потоке.
+    """
+    def read(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+            if not getattr(response, 'is_rendered', True):
+                response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    read = sync_to_async(read, thread_sensitive=False)
+    write = sync_to_async(view, thread_sensitive=True)
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await read(request, *args, **kwargs)
+        return await write(request, *args, **kwargs)
+    return async_view
+
+
+def async_read_urls(patterns, viewsets):
+    """Подменяет представления чтения у маршрутов указанных viewset."""
+    return [
+        URLPattern(pattern.pattern, async_read_view(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if getattr(pattern.callback, 'cls', None) in viewsets
+        and READ_ACTIONS & set(pattern.callback.actions.values())
+        else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,59 @@
+from copy import copy
+
+from api.caches import shared_cache
+from api.replicas import primary_reads
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+TOKEN_CACHE_PREFIX = 'auth-token'
+USER_COUNTERS = ('recipes_count', 'followers_count')
+
+
+def token_cache_key(key):
+    return f'{TOKEN_CACHE_PREFIX}:{key}'
+
+
+def forget_tokens(keys):
+    """Удаляет токены из кэша, следующий запрос прочитает их из базы."""
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+def cached_user(user):
+    """Копия пользователя для кэша с отложенными счетчиками.
+
+    Счетчики меняются через F() без сохранения пользователя, поэтому
+    в кэше они устарели бы. Отложенные поля читаются из базы при
+    обращении, а save() копии не перезаписывает их.
+    """
+    user = copy(user)
+    for field in USER_COUNTERS:
+        user.__dict__.pop(field, None)
+    return user
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кэшем соответствия токена пользователю.
+
+    Запись живет AUTH_TOKEN_CACHE_TTL секунд и удаляется при удалении
+    токена (выход) и при любом сохранении пользователя (смена пароля,
+    деактивация), поэтому на горячем пути аутентификация обходится
+    без запросов к базе. Удаление должно дойти до всех процессов,
+    поэтому с локальным кэшем токены каждый раз читаются из базы.
+    При промахе токен читается из основной базы: только что выданного
+    токена на реплике может еще не быть.
+    """
+
+    def authenticate_credentials(self, key):
+        if not shared_cache():
+            with primary_reads():
+                return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        user = cache.get(cache_key)
+        if user is not None:
+            return user, Token(key=key, user=user)
+        with primary_reads():
+            user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, cached_user(user), settings.AUTH_TOKEN_CACHE_TTL)
+        return user, token
@@ -0,0 +1,171 @@
+from recipe.cart import rebuild_carts
+from recipe.counters import COUNTERS, recount
+from recipe.models import (FavoritesList, Ingredients, Recipe,
+                           RecipeIngredients, ShoppingList, Subscription, Tags)
+from users.models import User
+
+RECIPES_PER_AUTHOR = 8
+
+# Бюджеты - верхние границы, а не точные замеры: запас в запрос-два
+# оставлен на то, в чем расходятся PostgreSQL и SQLite. Рост выше бюджета
+# почти всегда означает N+1.
+#
+# (название, адрес, пользователь, первый запрос, повторный запрос)
+# Первый запрос идет без документов рецептов и кеша и включает их
+# сборку, повторный - обычное чтение.
+READ_BUDGETS = (
+    ('recipes list anonymous', '/api/recipes/', None, 13, 4),
+    ('recipes list', '/api/recipes/', 'reader', 14, 5),
+    ('recipes list filtered',
+     '/api/recipes/?is_favorited=1&is_in_shopping_cart=1&tags={tag_slug}',
+     'reader', 15, 6),
+    ('recipes list several tags',
+     '/api/recipes/?tags={tag_slug}&tags={other_tag_slug}', 'reader', 15, 6),
+    ('recipes list search', '/api/recipes/?search={search}', 'reader', 14, 5),
+    ('recipes keyset page', '/api/recipes/?cursor=&limit=20', 'reader',
+     13, 4),
+    ('recipes feed', '/api/recipes/feed/', 'reader', 14, 6),
+    ('recipes retrieve', '/api/recipes/{recipe}/', 'reader', 13, 4),
+    ('download shopping cart', '/api/recipes/download_shopping_cart/',
+     'reader', 2, 2),
+    ('shopping cart summary', '/api/recipes/shopping_cart/summary/',
+     'reader', 2, 2),
+    ('users list', '/api/users/', 'reader', 4, 4),
+    ('users retrieve', '/api/users/{author}/', 'reader', 3, 3),
+    ('users me', '/api/users/me/', 'reader', 1, 1),
+    ('users me by token', '/api/users/me/', 'token', 2, 1),
+    ('subscriptions', '/api/users/subscriptions/?recipes_limit=3', 'reader',
+     5, 5),
+    ('ingredients list', '/api/ingredients/', None, 3, 1),
+    ('ingredients search', '/api/ingredients/?name={ingredient_name}', None,
+     3, 1),
+    ('ingredients retrieve', '/api/ingredients/{ingredient}/', None, 3, 3),
+    ('tags list', '/api/tags/', None, 3, 3),
+    ('tags retrieve', '/api/tags/{tag}/', None, 3, 3),
+    ('admin recipes', '/admin/recipe/recipe/', 'admin', 7, 7),
+    ('admin users', '/admin/users/user/', 'admin', 5, 5),
+    ('admin subscriptions', '/admin/recipe/subscription/', 'admin', 6, 6),
+    ('admin favorites', '/admin/recipe/favoriteslist/', 'admin', 6, 6),
+    ('admin shopping lists', '/admin/recipe/shoppinglist/', 'admin', 6, 6),
+)
+# (название, метод, адрес, пользователь, данные, бюджет запросов)
+WRITE_BUDGETS = (
+    ('recipes create', 'post', '/api/recipes/', 'author', {
+        'name': 'Бюджетный рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'tags': ['{tag}'],
+        'ingredients': [{'id': '{ingredient}', 'amount': 2}],
+    }, 21),
+    ('recipes update', 'patch', '/api/recipes/{own_recipe}/', 'author', {
+        'name': 'Обновленный рецепт',
+        'tags': ['{tag}'],
+        'ingredients': [{'id': '{ingredient}', 'amount': 5}],
+    }, 20),
+    ('recipes delete', 'delete', '/api/recipes/{spare_recipe}/', 'author',
+     None, 14),
+    ('favorite add', 'post', '/api/recipes/{recipe}/favorite/', 'admin',
+     None, 8),
+    ('favorite remove', 'delete', '/api/recipes/{listed_recipe}/favorite/',
+     'admin', None, 6),
+    ('shopping cart add', 'post', '/api/recipes/{recipe}/shopping_cart/',
+     'admin', None, 22),
+    ('shopping cart remove', 'delete',
+     '/api/recipes/{listed_recipe}/shopping_cart/', 'admin', None, 10),
+    ('favorite batch add', 'post', '/api/recipes/favorite/batch/', 'admin',
+     {'recipes': ['{recipe}', '{own_recipe}']}, 10),
+    # Удаление идет через delete() с сигналами: два запроса на рецепт.
+    ('favorite batch remove', 'delete', '/api/recipes/favorite/batch/',
+     'admin', {'recipes': ['{listed_recipe}', '{other_listed_recipe}']}, 12),
+    ('shopping cart batch add', 'post', '/api/recipes/shopping_cart/batch/',
+     'admin', {'recipes': ['{recipe}', '{own_recipe}']}, 11),
+    ('shopping cart batch remove', 'delete',
+     '/api/recipes/shopping_cart/batch/', 'admin',
+     {'recipes': ['{listed_recipe}', '{other_listed_recipe}']}, 13),
+    ('subscribe', 'post', '/api/users/{author}/subscribe/', 'admin',
+     None, 11),
+    ('unsubscribe', 'delete', '/api/users/{other}/subscribe/', 'admin',
+     None, 7),
+)
+
+
+def fill(value, fixture):
+    """Подставляет id тестовых данных в строки адресов и тел запросов."""
+    if isinstance(value, str):
+        return value.format(**fixture)
+    if isinstance(value, dict):
+        return {key: fill(item, fixture) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return type(value)(fill(item, fixture) for item in value)
+    return value
+
+
+def create_budget_data():
+    """Тестовые данные для замеров.
+
+    Возвращает пользователей по ролям и словарь id для fill. Каждое
+    действие из WRITE_BUDGETS выполнимо на этих данных само по себе.
+    """
+    users = {
+        key: User.objects.create_user(
+            username=f'budget_{key}', email=f'budget_{key}@example.com',
+            password='budget-password', is_staff=key == 'admin',
+            is_superuser=key == 'admin')
+        for key in ('author', 'reader', 'admin', 'other')
+    }
+    tags = [
+        Tags.objects.create(name=f'Бюджет {number}',
+                            color=f'#0000{number}0',
+                            slug=f'budget-{number}')
+        for number in range(3)
+    ]
+    ingredients = [
+        Ingredients.objects.create(
+            name=f'бюджетный ингредиент {number}', measurement_units='г')
+        for number in range(5)
+    ]
+    recipes = []
+    for author in (users['author'], users['other']):
+        for number in range(RECIPES_PER_AUTHOR):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Бюджет {author.id} {number}',
+                text='Суп дня', cooking_time=number + 1)
+            recipe.tags.set(tags[:number % 3 + 1])
+            RecipeIngredients.objects.bulk_create([
+                RecipeIngredients(recipe=recipe, ingredients=ingredient,
+                                  amount=number + 1)
+                for ingredient in ingredients[:number % 5 + 1]
+            ])
+            recipes.append(recipe)
+    reader, admin = users['reader'], users['admin']
+    listed = recipes[-3:-1]
+    FavoritesList.objects.bulk_create(
+        [FavoritesList(user=reader, recipe=recipe)
+         for recipe in recipes[::2]]
+        + [FavoritesList(user=admin, recipe=recipe) for recipe in listed])
+    ShoppingList.objects.bulk_create(
+        [ShoppingList(user=reader, recipe=recipe)
+         for recipe in recipes[::3]]
+        + [ShoppingList(user=admin, recipe=recipe) for recipe in listed])
+    rebuild_carts([reader.id, admin.id])
+    for model, counter, related_model, field in COUNTERS:
+        recount(model, counter, related_model, field)
+    Subscription.objects.create(user=reader, author=users['author'])
+    Subscription.objects.create(user=reader, author=users['other'])
+    Subscription.objects.create(user=admin, author=users['other'])
+    fixture = {
+        'author': users['author'].id,
+        'other': users['other'].id,
+        'recipe': recipes[-1].id,
+        'listed_recipe': listed[1].id,
+        'other_listed_recipe': listed[0].id,
+        'own_recipe': recipes[0].id,
+        'spare_recipe': recipes[1].id,
+        'tag': tags[0].id,
+        'tag_slug': tags[0].slug,
+        'other_tag_slug': tags[1].slug,
+        'ingredient': ingredients[0].id,
+        'ingredient_name': 'бюдж',
+        'search': 'Суп',
+    }
+    return users, fixture
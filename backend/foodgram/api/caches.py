@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache(alias=DEFAULT_CACHE_ALIAS):
+    """Кэш виден всем процессам сервера, а не только текущему."""
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_CACHE_BACKENDS
@@ -0,0 +1,56 @@
+from functools import wraps
+from hashlib import md5
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from recipe.versions import get_versions, user_version
+
+
+def make_etag(request, *parts):
+    """Сильный валидатор для адреса запроса и версий его данных."""
+    key = '|'.join(str(part) for part in (
+        *parts, request.get_full_path(), request.META.get('HTTP_ACCEPT', '')
+    ))
+    return f'"{md5(key.encode()).hexdigest()}"'
+
+
+def conditional_get(method):
+    """Отвечает 304 на совпавший If-None-Match / If-Modified-Since.
+
+    Валидаторы берутся из get_validators() представления и вычисляются
+    до выборки и сериализации данных.
+    """
+    @wraps(method)
+    def wrapper(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = method(self, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+    return wrapper
+
+
+class VersionedViewMixin:
+    """Валидаторы из версий таблиц, при user_versioned — и пользователя."""
+    version_names = ()
+    user_versioned = False
+
+    def get_version_names(self, request):
+        names = list(self.version_names)
+        if self.user_versioned and request.user.is_authenticated:
+            names.append(user_version(request.user.id))
+        return names
+
+    def get_validators(self, request):
+        names = self.get_version_names(request)
+        versions, last_modified = get_versions(names)
+        self.versions = dict(zip(names, versions))
+        return (
+            make_etag(request, *names, *versions),
+            int(last_modified.timestamp()) if last_modified else None
+        )
@@ -0,0 +1,166 @@
+import json
+from threading import local
+
+from api.replicas import primary_reads
+from api.serializers import RecipeSerializer
+from django.db import transaction
+from recipe.models import (Recipe, RecipeDocument, RecipeImage,
+                           RecipeIngredients)
+from recipe.versions import RECIPES, bump_versions
+
+_pending = local()
+
+
+def render_document(recipe):
+    """Неперсонализированная часть ответа RecipeSerializer.
+
+    Флаги пользователя сохраняются со значением False, картинка —
+    относительной ссылкой; personalize() подставляет их при чтении.
+    """
+    return json.dumps(RecipeSerializer(recipe).data, ensure_ascii=False)
+
+
+def document_data(recipe_ids):
+    """Данные документов рецептов без сериализаторов.
+
+    Тот же результат, что RecipeSerializer(recipe).data без запроса,
+    собранный из строк values() четырех запросов: рецепты с авторами,
+    теги, ингредиенты и варианты картинок. Ингредиенты и варианты
+    картинок идут в порядке id. Возвращает словари по id рецепта.
+    """
+    recipe_storage = Recipe._meta.get_field('image').storage
+    image_storage = RecipeImage._meta.get_field('image').storage
+    documents = {}
+    sources = {}
+    for row in Recipe.objects.filter(id__in=recipe_ids).order_by().values(
+            'id', 'name', 'image', 'text', 'cooking_time', 'author_id',
+            'author__email', 'author__username', 'author__first_name',
+            'author__last_name'):
+        sources[row['id']] = row['image']
+        documents[row['id']] = {
+            'id': row['id'],
+            'tags': [],
+            'author': {
+                'email': row['author__email'],
+                'id': row['author_id'],
+                'username': row['author__username'],
+                'first_name': row['author__first_name'],
+                'last_name': row['author__last_name'],
+                'is_subscribed': False,
+            },
+            'ingredients': [],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': row['name'],
+            'image': (recipe_storage.url(row['image']) if row['image']
+                      else None),
+            'images': {},
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+    if not documents:
+        return documents
+    tags = Recipe.tags.through.objects.filter(
+        recipe_id__in=documents).order_by('tags__name').values_list(
+            'recipe_id', 'tags_id', 'tags__name', 'tags__color', 'tags__slug')
+    for recipe_id, tag_id, name, color, slug in tags:
+        documents[recipe_id]['tags'].append(
+            {'id': tag_id, 'name': name, 'color': color, 'slug': slug})
+    ingredients = RecipeIngredients.objects.filter(
+        recipe_id__in=documents).order_by('id').values_list(
+            'recipe_id', 'ingredients_id', 'ingredients__name',
+            'ingredients__measurement_units', 'amount')
+    for recipe_id, ingredient_id, name, units, amount in ingredients:
+        documents[recipe_id]['ingredients'].append({
+            'id': ingredient_id,
+            'name': name,
+            'measurement_units': units,
+            'amount': amount,
+        })
+    variants = RecipeImage.objects.filter(
+        recipe_id__in=documents).order_by('id').values_list(
+            'recipe_id', 'source', 'size', 'format', 'image', 'width',
+            'height')
+    for recipe_id, source, size, image_format, image, width, height in (
+            variants):
+        if source != sources[recipe_id]:
+            continue
+        images = documents[recipe_id]['images'].setdefault(
+            size, {'width': width, 'height': height})
+        images[image_format] = image_storage.url(image)
+    return documents
+
+
+def rebuild_documents(recipe_ids):
+    """Пересобирает документы рецептов и возвращает их по id рецепта.
+
+    Версию RECIPES не меняет: досборка недостающих документов при чтении
+    не меняет ответы, и ETag этого же ответа должен остаться верным.
+    """
+    documents = [
+        RecipeDocument(recipe_id=recipe_id,
+                       document=json.dumps(data, ensure_ascii=False))
+        for recipe_id, data in document_data(recipe_ids).items()
+    ]
+    with transaction.atomic():
+        RecipeDocument.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeDocument.objects.bulk_create(documents)
+    return {document.recipe_id: document for document in documents}
+
+
+def _flush():
+    recipe_ids = _pending.recipe_ids
+    _pending.recipe_ids = set()
+    with transaction.atomic():
+        rebuild_documents(recipe_ids)
+        bump_versions(RECIPES)
+
+
+def schedule_rebuild(recipe_ids):
+    """Пересобирает документы после фиксации текущей транзакции.
+
+    Все изменения рецептов внутри одной транзакции приводят
+    к одной пересборке каждого затронутого документа.
+    """
+    connection = transaction.get_connection()
+    scheduled = any(func is _flush for _, func in connection.run_on_commit)
+    if not scheduled:
+        _pending.recipe_ids = set()
+    _pending.recipe_ids.update(recipe_ids)
+    if not scheduled:
+        transaction.on_commit(_flush)
+
+
+def personalize(document, recipe, request, subscriptions):
+    """Документ рецепта с флагами текущего пользователя."""
+    data = json.loads(document)
+    data['is_favorited'] = recipe.is_favorited
+    data['is_in_shopping_cart'] = recipe.is_in_shopping_cart
+    data['author']['is_subscribed'] = recipe.author_id in subscriptions
+    if data['image']:
+        data['image'] = request.build_absolute_uri(data['image'])
+    for variants in data['images'].values():
+        for image_format, _ in RecipeImage.FORMATS:
+            if variants.get(image_format):
+                variants[image_format] = request.build_absolute_uri(
+                    variants[image_format])
+    return data
+
+
+def render_recipes(recipes, request, subscriptions):
+    """Ответ для списка рецептов из сохраненных документов."""
+    documents = {
+        recipe.id: recipe.document for recipe in recipes
+        if hasattr(recipe, 'document')
+    }
+    missing = [recipe.id for recipe in recipes if recipe.id not in documents]
+    if missing:
+        # Документы собираются из основной базы: отстающая реплика
+        # записала бы в нее старые данные.
+        with primary_reads():
+            documents.update(rebuild_documents(missing))
+    return [
+        personalize(documents[recipe.id].document, recipe, request,
+                    subscriptions)
+        for recipe in recipes
+    ]
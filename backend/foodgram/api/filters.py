@@ -1,27 +1,64 @@
+from constants import SEARCH_CONFIG
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Exists, F, OuterRef, Q
 from django_filters import rest_framework as filters
-from recipe.models import Recipe, Tags
+from recipe.models import FavoritesList, Recipe, ShoppingList, Tags
 
 
 class SlugFilter(filters.FilterSet):
+    """Фильтры рецептов.
+
+    Теги, избранное и список покупок проверяются подзапросами EXISTS,
+    поэтому рецепт попадает в выдачу один раз без DISTINCT. Подзапросы
+    используют уникальные индексы (recipe, tags), (user, recipe).
+    """
     tags = filters.ModelMultipleChoiceFilter(field_name='tags__slug',
                                              to_field_name='slug',
-                                             queryset=Tags.objects.all())
+                                             queryset=Tags.objects.all(),
+                                             method='get_tags_filter')
     is_favorited = filters.BooleanFilter(method='get_favorited_filter')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_shopping_cart_filter')
+    search = filters.CharFilter(method='get_search_filter')
 
-    def get_favorited_filter(self, queryset, name, value):
+    def get_tags_filter(self, queryset, name, value):
+        if not value:
+            return queryset
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe=OuterRef('pk'), tags__in=value)))
+
+    def filter_by_user(self, queryset, model, value):
         user = self.request.user
         if value and user.is_authenticated:
-            return queryset.filter(favoriteslist__user=user)
+            return queryset.filter(Exists(model.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
         return queryset
 
+    def get_favorited_filter(self, queryset, name, value):
+        return self.filter_by_user(queryset, FavoritesList, value)
+
     def get_shopping_cart_filter(self, queryset, name, value):
-        user = self.request.user
-        if value and user.is_authenticated:
-            return queryset.filter(shoppinglist__user=user)
-        return queryset
+        return self.filter_by_user(queryset, ShoppingList, value)
+
+    def get_search_filter(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию.
+
+        На PostgreSQL — по индексированному search_vector с сортировкой
+        по релевантности, на остальных базах — вхождение подстроки.
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        if connection.vendor != 'postgresql':
+            return queryset.filter(
+                Q(name__icontains=value) | Q(text__icontains=value))
+        query = SearchQuery(value, config=SEARCH_CONFIG)
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by('-search_rank', '-pub_date', '-id')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
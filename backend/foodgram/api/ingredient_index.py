@@ -0,0 +1,91 @@
+from bisect import bisect_left
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db.models import Count
+from recipe.models import Ingredients, RecipeIngredients
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Сначала отдаются ингредиенты, название которых начинается с запроса,
+    затем те, в названии которых запрос встречается. Внутри каждой группы
+    ингредиенты упорядочены по частоте использования в рецептах.
+    Индекс перестраивается после изменения ингредиентов в этом процессе,
+    при новой версии INGREDIENTS из другого процесса и не реже, чем раз
+    в INGREDIENT_INDEX_TTL секунд. Частота использования меняется вместе
+    с рецептами и обновляется только по INGREDIENT_INDEX_TTL.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._built_at = None
+        self._version = None
+        self._index = ([], [], [])
+
+    def invalidate(self):
+        self._built_at = None
+
+    def build(self):
+        usage = dict(
+            RecipeIngredients.objects.order_by().values(
+                'ingredients'
+            ).annotate(usage=Count('id')).values_list('ingredients', 'usage')
+        )
+        items = sorted(
+            Ingredients.objects.order_by().values(
+                'id', 'name', 'measurement_units'),
+            key=lambda item: (item['name'].lower(), item['id'])
+        )
+        self._index = (
+            items,
+            [item['name'].lower() for item in items],
+            [usage.get(item['id'], 0) for item in items]
+        )
+        self._built_at = monotonic()
+
+    def ensure_built(self, version=None):
+        """Перестраивает устаревший индекс.
+
+        version - текущая версия INGREDIENTS: индекс, построенный
+        при другой версии, перестраивается сразу.
+        """
+        built_at = self._built_at
+        if (built_at is not None
+                and version in (None, self._version)
+                and monotonic() - built_at < settings.INGREDIENT_INDEX_TTL):
+            return
+        with self._lock:
+            if self._built_at is built_at:
+                self.build()
+                if version is not None:
+                    self._version = version
+
+    def all(self):
+        self.ensure_built()
+        return self._index[0]
+
+    def search(self, query):
+        self.ensure_built()
+        items, names, usage = self._index
+        query = query.lower()
+        start = bisect_left(names, query)
+        end = start
+        while end < len(names) and names[end].startswith(query):
+            end += 1
+        prefix = range(start, end)
+        substring = [
+            position for position, name in enumerate(names)
+            if query in name and not start <= position < end
+        ]
+        return [
+            items[position]
+            for group in (prefix, substring)
+            for position in sorted(
+                group, key=lambda position: (-usage[position], position))
+        ]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,195 @@
+import asyncio
+import heapq
+import logging
+from contextvars import ContextVar
+from time import perf_counter
+
+from api.caches import shared_cache
+from api.replicas import pin_cache_key, replica_aliases, replica_reads
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+current_timer = ContextVar('current_timer', default=None)
+
+
+class QueryTimer:
+    """Считает запросы к базе, их суммарное время и самые медленные."""
+
+    def __init__(self, slowest):
+        self.slowest = slowest
+        self.count = 0
+        self.duration = 0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            statement = (elapsed, self.count, sql)
+            if len(self.statements) < self.slowest:
+                heapq.heappush(self.statements, statement)
+            else:
+                heapq.heappushpop(self.statements, statement)
+
+    def slowest_statements(self):
+        return sorted(self.statements, reverse=True)
+
+
+def timed_execute(execute, sql, params, many, context):
+    timer = current_timer.get()
+    if timer is None:
+        return execute(sql, params, many, context)
+    return timer(execute, sql, params, many, context)
+
+
+def install_timer(connection, **kwargs):
+    """Подключает timed_execute к соединению с базой.
+
+    Соединения у каждого потока свои, поэтому таймер запроса передается
+    через current_timer: он доходит и до потоков sync_to_async.
+    Обертка ставится первой, чтобы ее не снял выход из execute_wrapper.
+    """
+    if timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, timed_execute)
+
+
+class HybridMiddleware:
+    """Middleware, которое Django вызывает и синхронно, и асинхронно.
+
+    Иначе под ASGI Django 3.2 выполняет его в общем потоке
+    thread_sensitive, и асинхронное чтение теряет параллельность.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class QueryTimingMiddleware(HybridMiddleware):
+    """Количество и время SQL-запросов для каждого запроса к сайту.
+
+    Включается настройкой SQL_TIMING. Добавляет заголовки Server-Timing
+    и X-DB-Queries и пишет в лог самые медленные запросы к базе, если
+    их суммарное время не меньше SQL_TIMING_LOG_MS.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SQL_TIMING:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        connection_created.connect(install_timer)
+        for alias in connections:
+            install_timer(connections[alias])
+
+    def handle(self, request):
+        timer = QueryTimer(settings.SQL_TIMING_SLOWEST)
+        token = current_timer.set(timer)
+        started = perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer, started)
+
+    async def __acall__(self, request):
+        timer = QueryTimer(settings.SQL_TIMING_SLOWEST)
+        token = current_timer.set(timer)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_timer.reset(token)
+        return self.finish(request, response, timer, started)
+
+    def finish(self, request, response, timer, started):
+        total = (perf_counter() - started) * 1000
+        duration = timer.duration * 1000
+        response['X-DB-Queries'] = str(timer.count)
+        response['Server-Timing'] = (
+            f'db;dur={duration:.1f};desc="{timer.count} queries", '
+            f'total;dur={total:.1f}'
+        )
+        if duration >= settings.SQL_TIMING_LOG_MS:
+            self.log(request, timer, duration, total)
+        return response
+
+    def log(self, request, timer, duration, total):
+        lines = [
+            f'{request.method} {request.get_full_path()}: '
+            f'{timer.count} queries, db {duration:.1f} ms, '
+            f'total {total:.1f} ms'
+        ]
+        lines.extend(
+            f'  {elapsed * 1000:.1f} ms #{number}: {sql}'
+            for elapsed, number, sql in timer.slowest_statements()
+        )
+        logger.info('\n'.join(lines))
+
+
+def pin(key):
+    if key is not None:
+        cache.set(key, True, settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned(key):
+    return key is not None and cache.get(key) is not None
+
+
+class ReplicaMiddleware(HybridMiddleware):
+    """Чтение с реплик для безопасных запросов.
+
+    После изменяющего запроса клиент с тем же заголовком Authorization
+    или сессией REPLICA_PIN_SECONDS секунд читает из основной базы,
+    чтобы видеть свои изменения, пока реплики догоняют основную базу.
+    Без реплик в DATABASES не подключается. Закрепление хранится в кэше,
+    поэтому кэш должен быть общим для всех процессов сервера.
+    """
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        if not shared_cache():
+            raise ImproperlyConfigured(
+                'Для реплик нужен общий кэш, задайте MEMCACHED_LOCATION.')
+        super().__init__(get_response)
+
+    def handle(self, request):
+        key = pin_cache_key(request)
+        if request.method not in self.safe_methods:
+            response = self.get_response(request)
+            pin(key)
+            return response
+        if is_pinned(key):
+            return self.get_response(request)
+        with replica_reads():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        key = pin_cache_key(request)
+        if request.method not in self.safe_methods:
+            response = await self.get_response(request)
+            await sync_to_async(pin, thread_sensitive=False)(key)
+            return response
+        if await sync_to_async(is_pinned, thread_sensitive=False)(key):
+            return await self.get_response(request)
+        with replica_reads():
+            return await self.get_response(request)
@@ -0,0 +1,104 @@
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+from datetime import datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class RecipeKeysetPagination(BasePagination):
+    """Keyset-пагинация рецептов по (pub_date, id).
+
+    Следующая страница выбирается условием по последнему показанному
+    рецепту, поэтому время ответа не зависит от глубины прокрутки,
+    а новые рецепты не сдвигают уже показанные.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    max_limit = 100
+    invalid_cursor_message = 'Неверный курсор.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        position = self.start(request)
+        queryset = queryset.order_by('-pub_date', '-id')
+        if position is not None:
+            pub_date, pk = position
+            queryset = queryset.filter(pub_date__lte=pub_date).exclude(
+                pub_date=pub_date, id__gte=pk)
+        return self.set_page(list(queryset[:self.limit + 1]))
+
+    def start(self, request):
+        """Запоминает запрос и лимит, возвращает позицию из курсора."""
+        self.request = request
+        self.limit = self.get_limit(request)
+        return self.decode_cursor(request)
+
+    def set_page(self, results):
+        """Страница из limit + 1 рецептов, следующих за позицией."""
+        self.has_next = len(results) > self.limit
+        self.page = results[:self.limit]
+        return self.page
+
+    def get_limit(self, request):
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        if limit <= 0:
+            return api_settings.PAGE_SIZE
+        return min(limit, self.max_limit)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            pub_date, pk = b64decode(encoded.encode()).decode().split('|')
+            return datetime.fromisoformat(pub_date), int(pk)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, recipe):
+        position = f'{recipe.pub_date.isoformat()}|{recipe.id}'
+        return b64encode(position.encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
+
+
+class RecipePagination(LimitOffsetPagination):
+    """limit/offset по умолчанию, keyset-пагинация с параметром cursor.
+
+    Первая страница бесконечной ленты запрашивается с пустым cursor=,
+    следующие — по ссылке next.
+    """
+    cursor_query_param = 'cursor'
+    keyset_class = RecipeKeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
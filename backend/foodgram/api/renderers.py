@@ -0,0 +1,130 @@
+import csv
+from functools import lru_cache
+from io import BytesIO
+from itertools import chain
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFError, TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+SHOPPING_CART_TITLE = 'Список покупок:'
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единицы измерения')
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_FONT_SIZE = 12
+PDF_MARGIN = 20 * mm
+PDF_LINE_HEIGHT = 7 * mm
+CHUNK_SIZE = 64 * 1024
+
+
+@lru_cache(maxsize=None)
+def get_pdf_font():
+    """Шрифт с кириллицей, если он есть в системе."""
+    try:
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, settings.PDF_FONT_PATH))
+    except TTFError:
+        return 'Helvetica'
+    return PDF_FONT_NAME
+
+
+class Echo:
+    """Буфер для csv.writer, который сразу возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartNegotiation(DefaultContentNegotiation):
+    """Для неподходящего Accept список покупок отдается первым
+    рендерером (текстом), как до выбора формата."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            return renderers[0], renderers[0].media_type
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    stream() отдает файл по частям для StreamingHttpResponse,
+    render() используется DRF для ответов с ошибками.
+    """
+    charset = 'utf-8'
+    header = ((SHOPPING_CART_TITLE,),)
+
+    def stream(self, ingredients):
+        rows = (
+            (item['name'], item['amount'], item['measurement_units'])
+            for item in ingredients
+        )
+        return self.render_rows(chain(self.header, rows))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = [(f'{key}: {value}',) for key, value in data.items()]
+        return b''.join(self.render_rows(data or ()))
+
+    def format_line(self, row):
+        if len(row) == 3:
+            name, amount, measurement_units = row
+            return f'{name}, {amount} {measurement_units}'
+        return ' '.join(str(value) for value in row)
+
+    def render_rows(self, rows):
+        raise NotImplementedError
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render_rows(self, rows):
+        for row in rows:
+            yield f'{self.format_line(row)}\n'.encode(self.charset)
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    header = (CSV_HEADER,)
+
+    def render_rows(self, rows):
+        writer = csv.writer(Echo())
+        for row in rows:
+            yield writer.writerow(row).encode(self.charset)
+
+
+class ShoppingCartPDFRenderer(ShoppingCartRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def render_rows(self, rows):
+        """Собирает PDF построчно и отдает его частями.
+
+        Таблица ссылок PDF пишется в конце файла, поэтому документ
+        целиком собирается в памяти и только потом отдается частями:
+        в отличие от txt и csv, этот формат не потоковый.
+        """
+        buffer = BytesIO()
+        document = canvas.Canvas(buffer, pagesize=A4)
+        font = get_pdf_font()
+        top = A4[1] - PDF_MARGIN
+        y = top
+        for row in rows:
+            if y < PDF_MARGIN:
+                document.showPage()
+                y = top
+            document.setFont(font, PDF_FONT_SIZE)
+            document.drawString(PDF_MARGIN, y, self.format_line(row))
+            y -= PDF_LINE_HEIGHT
+        document.save()
+        buffer.seek(0)
+        yield from iter(lambda: buffer.read(CHUNK_SIZE), b'')
@@ -1,11 +1,15 @@
 import re
 
-from api.validators import validate_amount, validate_username
+from api.validators import (validate_amount, validate_recipes_limit,
+                            validate_username)
+from constants import RECIPES_BATCH_MAX
 from django.core.validators import MinValueValidator
-from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
-from recipe.models import (FavoritesList, Ingredients, Recipe,
+from recipe import cart
+from recipe.models import (FavoritesList, Ingredients, Recipe, RecipeImage,
                            RecipeIngredients, ShoppingList, Subscription, Tags)
 from rest_framework import serializers
 from users.models import EMAIL_LENGTH, USERNAME_PASSWORD_LENGTH, User
@@ -20,6 +24,9 @@ class UserSerializer(UserSerializer):
     def get_subscribed(self, obj):
         request = self.context.get('request')
         if request and not request.user.is_anonymous:
+            subscriptions = self.context.get('subscriptions')
+            if subscriptions is not None:
+                return obj.id in subscriptions
             return Subscription.objects.filter(user=request.user,
                                                author=obj).exists()
         return False
@@ -75,14 +82,32 @@ class SetPasswordSerializer(serializers.ModelSerializer):
             'current_password'
         )
 
-    def update_password(self, instance, validate_data):
-        if validate_data['current_password'] == validate_data['new_password']:
+    def validate_current_password(self, value):
+        if not self.instance.check_password(value):
+            raise serializers.ValidationError('Неверный пароль.')
+        return value
+
+    def update(self, instance, validated_data):
+        if validated_data['current_password'] == validated_data[
+                'new_password']:
             raise serializers.ValidationError(
                 {'new_password': 'Новый пароль должен отличаться от старого.'}
             )
-        instance.set_password(validate_data['new_password'])
-        instance.save()
-        return validate_data
+        instance.set_password(validated_data['new_password'])
+        instance.save(update_fields=['password'])
+        return instance
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """ Сериализатор списка id рецептов для пакетных действий."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPES_BATCH_MAX
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -127,19 +152,64 @@ class RecipeIngredientsCreateSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeFavoriteSerializer(serializers.ModelSerializer):
+class RecipeImagesMixin(serializers.Serializer):
+    """Ссылки на уменьшенные варианты картинки рецепта."""
+    images = serializers.SerializerMethodField(method_name='get_images')
+
+    def build_url(self, url):
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(url)
+        return url
+
+    def get_images(self, obj):
+        images = {}
+        for variant in obj.images.all():
+            if variant.source != obj.image.name:
+                continue
+            size = images.setdefault(variant.size, {
+                'width': variant.width,
+                'height': variant.height
+            })
+            size[variant.format] = self.build_url(variant.image.url)
+        return images
+
+    def get_card_image(self, obj):
+        """JPEG для карточки, пока его нет — исходная картинка."""
+        if not obj.image:
+            return None
+        card = self.get_images(obj).get(RecipeImage.CARD, {})
+        return card.get(RecipeImage.JPEG) or self.build_url(obj.image.url)
+
+
+class RecipeFavoriteSerializer(RecipeImagesMixin,
+                               serializers.ModelSerializer):
     """Список рецептов без ингридиентов."""
-    image = Base64ImageField(read_only=True)
+    image = serializers.SerializerMethodField(method_name='get_card_image')
     name = serializers.ReadOnlyField()
     cooking_time = serializers.ReadOnlyField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'name',
-                  'image', 'cooking_time')
+                  'image', 'images', 'cooking_time')
+
+
+def recipe_prefetches():
+    """Связанные данные RecipeSerializer в порядке документов рецептов.
+
+    Теги идут по названию, ингредиенты и варианты картинок - по id.
+    """
+    return (
+        'tags',
+        Prefetch('recipeingredients',
+                 queryset=RecipeIngredients.objects.select_related(
+                     'ingredients').order_by('id')),
+        Prefetch('images', queryset=RecipeImage.objects.order_by('id')),
+    )
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(RecipeImagesMixin, serializers.ModelSerializer):
     """ Сериализатор получения рецепта."""
     name = serializers.ReadOnlyField()
     author = UserSerializer(read_only=True)
@@ -156,6 +226,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         method_name='get_shopping_cart')
 
     def get_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         if request and not request.user.is_anonymous:
             return FavoritesList.objects.filter(user=request.user,
@@ -163,6 +235,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         return False
 
     def get_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         if request and not request.user.is_anonymous:
             return ShoppingList.objects.filter(user=request.user,
@@ -174,7 +248,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'tags',
                   'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image',
+                  'name', 'image', 'images',
                   'text', 'cooking_time')
         read_only_fields = ('id',
                             'author',
@@ -214,11 +288,17 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 'Добавьте ингредиент.'
             )
         ingredients = [item['id'] for item in value]
-        for ingredient in ingredients:
-            if ingredients.count(ingredient) > 1:
-                raise serializers.ValidationError(
-                    'Такой ингредиент уже есть.'
-                )
+        if len(set(ingredients)) != len(ingredients):
+            raise serializers.ValidationError(
+                'Такой ингредиент уже есть.'
+            )
+        existing = set(Ingredients.objects.filter(
+            id__in=ingredients).values_list('id', flat=True))
+        unknown = [str(item) for item in ingredients if item not in existing]
+        if unknown:
+            raise serializers.ValidationError(
+                f'Ингредиенты не найдены: {", ".join(unknown)}.'
+            )
         return value
 
     def validate_cooking_time(self, cooking_time):
@@ -228,34 +308,68 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return cooking_time
 
     def create_ingredients(self, ingredients, recipe):
-        for ingredient_data in ingredients:
-            amount = ingredient_data['amount']
-            ingredient_id = ingredient_data['id']
-            if ingredient_id:
-                ingredient = get_object_or_404(Ingredients, pk=ingredient_id)
-                RecipeIngredients.objects.create(
-                    recipe=recipe,
-                    ingredients=ingredient,
-                    amount=amount)
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe,
+                ingredients_id=ingredient_data['id'],
+                amount=ingredient_data['amount'])
+            for ingredient_data in ingredients
+        )
 
+    def update_ingredients(self, ingredients, recipe):
+        """Изменяет только отличающиеся строки ингредиентов рецепта.
+
+        Разница количеств переносится в списки покупок с этим рецептом.
+        """
+        amounts = {item['id']: item['amount'] for item in ingredients}
+        existing = {
+            row.ingredients_id: row
+            for row in RecipeIngredients.objects.filter(recipe=recipe)
+        }
+        deltas = {}
+        removed = []
+        for ingredient_id, row in existing.items():
+            if ingredient_id not in amounts:
+                removed.append(row.id)
+                deltas[ingredient_id] = -row.amount
+        if removed:
+            RecipeIngredients.objects.filter(id__in=removed).delete()
+        changed = []
+        for ingredient_id, row in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and row.amount != amount:
+                deltas[ingredient_id] = amount - row.amount
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            RecipeIngredients.objects.bulk_update(changed, ['amount'])
+        added = [item for item in ingredients if item['id'] not in existing]
+        self.create_ingredients(added, recipe)
+        deltas.update((item['id'], item['amount']) for item in added)
+        cart.recipe_changed(recipe.id, deltas)
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
-        recipe.save()
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients, instance)
-        instance.tags.set(validated_data.pop('tags'))
+        ingredients = validated_data.pop('ingredients', None)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, instance)
+        tags = validated_data.pop('tags', None)
+        if tags is not None:
+            instance.tags.set(tags)
         return super().update(
             instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], *recipe_prefetches())
         serializer = RecipeSerializer(
             instance,
             context={'request': self.context.get('request')}
@@ -300,22 +414,27 @@ class SubscriptionSerializer(serializers.ModelSerializer):
     def get_subscribed(self, obj):
         request = self.context.get('request')
         if request and not request.user.is_anonymous:
+            subscriptions = self.context.get('subscriptions')
+            if subscriptions is not None:
+                return obj.id in subscriptions
             return Subscription.objects.filter(user=request.user,
                                                author=obj).exists()
         return False
 
     def get_recipe(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            recipes = recipes[:int(limit)]
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            request = self.context.get('request')
+            limit = validate_recipes_limit(
+                request.GET.get('recipes_limit'))
+            recipes = obj.recipes.prefetch_related('images')[:limit]
         return SubscribeSerializer(
             recipes,
             many=True).data
 
     def get_recipe_count(self, obj):
-        return Recipe.objects.filter(author=obj).count()
+        return obj.recipes_count
 
     class Meta:
         model = Subscription
@@ -327,9 +446,10 @@ class SubscriptionSerializer(serializers.ModelSerializer):
                           'is_in_shopping_cart')
 
 
-class SubscribeSerializer(serializers.ModelSerializer):
+class SubscribeSerializer(RecipeImagesMixin, serializers.ModelSerializer):
     """Сериализатор подписок, подписка на автора."""
+    image = serializers.SerializerMethodField(method_name='get_card_image')
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
@@ -0,0 +1,98 @@
+from api.authentication import forget_tokens
+from api.documents import schedule_rebuild
+from api.ingredient_index import ingredient_index
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from recipe.models import (FavoritesList, Ingredients, Recipe,
+                           RecipeIngredients, ShoppingList, Subscription, Tags)
+from recipe.versions import (INGREDIENTS, RECIPES, TAGS, bump_versions,
+                             user_version)
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+AUTHOR_FIELDS = frozenset(
+    ('email', 'username', 'first_name', 'last_name'))
+
+
+def rebuild_recipes(recipes):
+    recipe_ids = list(recipes.values_list('id', flat=True))
+    if recipe_ids:
+        schedule_rebuild(recipe_ids)
+
+
+@receiver((post_save, post_delete), sender=Ingredients)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
+    bump_versions(INGREDIENTS)
+
+
+@receiver((post_save, post_delete), sender=Tags)
+def tags_version(**kwargs):
+    bump_versions(TAGS)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(**kwargs):
+    bump_versions(RECIPES)
+
+
+@receiver((post_save, post_delete), sender=FavoritesList)
+@receiver((post_save, post_delete), sender=ShoppingList)
+@receiver((post_save, post_delete), sender=Subscription)
+def user_lists_changed(instance, **kwargs):
+    bump_versions(user_version(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, **kwargs):
+    schedule_rebuild([instance.id])
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredients)
+def recipe_ingredients_changed(instance, **kwargs):
+    schedule_rebuild([instance.recipe_id])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            schedule_rebuild([instance.id])
+    elif action in ('post_add', 'post_remove'):
+        schedule_rebuild(pk_set)
+    elif action == 'pre_clear':
+        rebuild_recipes(instance.recipe_set.all())
+
+
+@receiver(post_save, sender=Tags)
+@receiver(pre_delete, sender=Tags)
+def tag_changed(instance, created=False, **kwargs):
+    if not created:
+        rebuild_recipes(instance.recipe_set.all())
+
+
+@receiver(post_save, sender=Ingredients)
+def ingredient_saved(instance, created, **kwargs):
+    if not created:
+        rebuild_recipes(instance.recipe_ingredients.all())
+
+
+@receiver(post_save, sender=User)
+def author_saved(instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is None or AUTHOR_FIELDS & set(update_fields):
+        rebuild_recipes(instance.recipes.all())
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(instance, **kwargs):
+    forget_tokens([instance.key])
+
+
+@receiver(post_save, sender=User)
+def user_saved(instance, created, **kwargs):
+    if not created:
+        forget_tokens(Token.objects.filter(
+            user=instance).values_list('key', flat=True))
@@ -1,3 +1,4 @@
+from api.async_views import async_read_urls
 from api.views import (IngredientsViewSet, RecipeViewSet, TagViewSet,
                        UserViewSet)
 from django.conf import settings
@@ -14,8 +15,13 @@ router_v1.register('recipes', RecipeViewSet, basename='recipes')
 router_v1.register('ingredients', IngredientsViewSet, basename='ingredients')
 router_v1.register('tags', TagViewSet, basename='tags')
 
+router_urls = router_v1.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_read_urls(
+        router_urls, (RecipeViewSet, TagViewSet, IngredientsViewSet))
+
 urlpatterns = [
-    path('', include(router_v1.urls)),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
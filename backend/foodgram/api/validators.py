@@ -1,5 +1,6 @@
 import re
 
+from constants import RECIPES_LIMIT_MAX
 from django.core.exceptions import ValidationError
 from rest_framework import serializers
 
@@ -23,3 +24,17 @@ def validate_amount(amount):
         raise serializers.ValidationError(
             'Минимаьное количество ингредиентов - 1')
     return amount
+
+
+def validate_recipes_limit(recipes_limit):
+    if recipes_limit is None:
+        return RECIPES_LIMIT_MAX
+    try:
+        recipes_limit = int(recipes_limit)
+    except (TypeError, ValueError):
+        raise serializers.ValidationError(
+            {'recipes_limit': 'Должно быть целым числом.'})
+    if recipes_limit < 0:
+        raise serializers.ValidationError(
+            {'recipes_limit': 'Не может быть отрицательным.'})
+    return min(recipes_limit, RECIPES_LIMIT_MAX)
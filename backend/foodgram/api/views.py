@@ -1,17 +1,31 @@
+from api.conditional import VersionedViewMixin, conditional_get
+from api.documents import render_recipes
 from api.filters import SlugFilter
+from api.ingredient_index import ingredient_index
+from api.pagination import RecipeKeysetPagination, RecipePagination
 from api.permissions import IsAuthorOrAdminOrReadOnly
+from api.renderers import (ShoppingCartCSVRenderer, ShoppingCartNegotiation,
+                           ShoppingCartPDFRenderer, ShoppingCartTextRenderer)
 from api.serializers import (FavoritesList, IngredientsSerializer,
-                             RecipeCreateSerializer, RecipeFavoriteSerializer,
-                             RecipeSerializer, SetPasswordSerializer,
-                             SubscriptionSerializer, TagSerializer,
-                             UserCreateSerializer, UserSerializer)
-from django.db.models import Sum
+                             RecipeBatchSerializer, RecipeCreateSerializer,
+                             RecipeFavoriteSerializer, RecipeSerializer,
+                             SetPasswordSerializer, SubscriptionSerializer,
+                             TagSerializer, UserCreateSerializer,
+                             UserSerializer)
+from api.validators import validate_recipes_limit
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Exists, F, OuterRef, Prefetch, Value,
+                              prefetch_related_objects)
 from django.db.models.functions import Lower
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from recipe.models import (Ingredients, Recipe, RecipeIngredients,
-                           ShoppingList, Subscription, Tags, User)
+from recipe import cart, lists
+from recipe.feed import feed_recipes
+from recipe.models import (Ingredients, Recipe, ShoppingCartItem, ShoppingList,
+                           Subscription, Tags, User)
+from recipe.versions import INGREDIENTS, RECIPES, TAGS
 from rest_framework import exceptions, filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.pagination import LimitOffsetPagination
@@ -19,23 +33,54 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class SubscriptionsContextMixin:
+    """Подписки пользователя на авторов страницы одним запросом.
+
+    Множество id авторов передается в контекст сериализатора,
+    UserSerializer отвечает на is_subscribed по нему.
+    """
+    subscriptions_actions = ('list', 'retrieve')
+
+    def get_subscription_authors(self, instances):
+        return (user.id for user in instances)
+
+    def get_subscriptions(self, author_ids):
+        user = self.request.user
+        author_ids = set(author_ids) - {user.id}
+        if user.is_anonymous or not author_ids:
+            return set()
+        return set(Subscription.objects.filter(
+            user=user, author_id__in=author_ids
+        ).values_list('author_id', flat=True))
+
+    def get_serializer(self, *args, **kwargs):
+        if args and self.action in self.subscriptions_actions:
+            instances = args[0] if kwargs.get('many') else [args[0]]
+            context = self.get_serializer_context()
+            context['subscriptions'] = self.get_subscriptions(
+                self.get_subscription_authors(instances))
+            kwargs['context'] = context
+        return super().get_serializer(*args, **kwargs)
+
+
+class UserViewSet(SubscriptionsContextMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ('email', 'username')
     pagination_class = LimitOffsetPagination
     permission_classes = (AllowAny,)
     serializer_class = UserCreateSerializer
+    subscriptions_actions = ('list', 'retrieve', 'me')
 
     def get_serializer_class(self):
-        if self.action == 'list' or self.action == 'retrieve':
+        if self.action in self.subscriptions_actions:
             return UserSerializer
         return UserCreateSerializer
 
     @action(detail=False, methods=['get'],
             permission_classes=(IsAuthenticated,))
     def me(self, request):
-        serializer = UserSerializer(request.user)
+        serializer = self.get_serializer(request.user)
         return Response(serializer.data,
                         status=status.HTTP_200_OK)
 
@@ -51,12 +96,23 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'],
             permission_classes=(IsAuthenticated,))
     def subscriptions(self, request):
+        limit = validate_recipes_limit(
+            request.query_params.get('recipes_limit'))
         queryset = User.objects.filter(following__user=request.user)
-        paginate_queryset = self.paginate_queryset(queryset)
+        authors = self.paginate_queryset(queryset)
+        prefetch_related_objects(authors, Prefetch(
+            'recipes',
+            queryset=Recipe.objects.latest_by_author(
+                [author.id for author in authors], limit
+            ).prefetch_related('images'),
+            to_attr='limited_recipes'
+        ))
+        context = self.get_serializer_context()
+        context['subscriptions'] = {author.id for author in authors}
         serializer = SubscriptionSerializer(
-            paginate_queryset,
+            authors,
             many=True,
-            context={'request': request}
+            context=context
         )
         return self.get_paginated_response(serializer.data)
 
@@ -79,28 +135,70 @@ class UserViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_204_NO_CONTENT)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(VersionedViewMixin, SubscriptionsContextMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     filter_backends = (DjangoFilterBackend,)
     filterset_class = SlugFilter
     filterset_fields = ('author', 'tags')
-    pagination_class = LimitOffsetPagination
+    pagination_class = RecipePagination
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     serializer_class = RecipeSerializer
+    version_names = (RECIPES,)
+    user_versioned = True
 
     def get_queryset(self):
-        recipes = Recipe.objects.prefetch_related(
-            'recipeingredients__ingredients', 'tags')
-        return recipes
+        recipes = Recipe.objects.select_related(
+            'author', 'document').defer('search_vector')
+        user = self.request.user
+        if user.is_anonymous:
+            return recipes.annotate(is_favorited=Value(False),
+                                    is_in_shopping_cart=Value(False))
+        return recipes.annotate(
+            is_favorited=Exists(FavoritesList.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingList.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
 
     def get_serializer_class(self):
         if self.action == 'list' or self.action == 'retrieve':
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    def get_subscription_authors(self, instances):
+        return (recipe.author_id for recipe in instances)
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        recipes = self.paginate_queryset(queryset)
+        return self.get_paginated_response(self.render_recipes(recipes))
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        return Response(self.render_recipes([recipe])[0])
+
+    def render_recipes(self, recipes):
+        """Рецепты из сохраненных документов с флагами пользователя."""
+        subscriptions = self.get_subscriptions(
+            self.get_subscription_authors(recipes))
+        return render_recipes(recipes, self.request, subscriptions)
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(detail=False, methods=['get'],
+            permission_classes=(IsAuthenticated,))
+    @conditional_get
+    def feed(self, request):
+        paginator = RecipeKeysetPagination()
+        position = paginator.start(request)
+        recipes = paginator.set_page(feed_recipes(
+            request.user, self.get_queryset(), position,
+            paginator.limit + 1))
+        return paginator.get_paginated_response(self.render_recipes(recipes))
+
     @action(detail=True, methods=['post', 'delete'])
     def favorite(self, request, **kwargs):
         user = self.request.user
@@ -130,50 +228,88 @@ class RecipeViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post', 'delete'],
             permission_classes=(IsAuthenticated,))
     def shopping_cart(self, request, **kwargs):
-        recipe = get_object_or_404(Recipe, id=kwargs['pk'])
+        recipe = get_object_or_404(self.get_queryset(), id=kwargs['pk'])
         user = self.request.user
         if request.method == 'POST':
-            shoppinglist_recipe, created = ShoppingList.objects.get_or_create(
-                user=user,
-                recipe=recipe
-            )
-            if not created:
-                raise exceptions.ValidationError(
-                    'Рецепт уже в списке покупок.')
-            serializer = RecipeSerializer(
-                recipe,
-                context={'request': request})
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            with transaction.atomic():
+                shoppinglist_recipe, created = (
+                    ShoppingList.objects.get_or_create(user=user,
+                                                       recipe=recipe))
+                if not created:
+                    raise exceptions.ValidationError(
+                        'Рецепт уже в списке покупок.')
+                cart.add_recipes(user.id, [recipe.id])
+            recipe.is_in_shopping_cart = True
+            return Response(self.render_recipes([recipe])[0],
+                            status=status.HTTP_201_CREATED)
         if request.method == 'DELETE':
-            get_object_or_404(ShoppingList, user=user,
-                              recipe=recipe).delete()
+            with transaction.atomic():
+                get_object_or_404(ShoppingList, user=user,
+                                  recipe=recipe).delete()
+                cart.remove_recipes(user.id, [recipe.id])
             return Response(
                 {'detail': 'Рецепт успешно удален из списка покупок.'},
                 status=status.HTTP_204_NO_CONTENT
             )
 
-    @action(detail=False, methods=['get'],
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='favorite/batch', permission_classes=(IsAuthenticated,))
+    def favorite_batch(self, request):
+        return self.change_lists(request, FavoritesList)
+
+    @action(detail=False, methods=['post', 'delete'],
+            url_path='shopping_cart/batch',
             permission_classes=(IsAuthenticated,))
+    def shopping_cart_batch(self, request):
+        return self.change_lists(request, ShoppingList)
+
+    def change_lists(self, request, model):
+        """Пакетное добавление (POST) или удаление (DELETE) рецептов."""
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        change = (lists.add_recipes if request.method == 'POST'
+                  else lists.remove_recipes)
+        with transaction.atomic():
+            results = change(model, request.user.id,
+                             serializer.validated_data['recipes'])
+        return Response({'recipes': [
+            {'id': recipe_id, 'result': result}
+            for recipe_id, result in results.items()
+        ]})
+
+    @action(detail=False, methods=['get'],
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(ShoppingCartTextRenderer,
+                              ShoppingCartCSVRenderer,
+                              ShoppingCartPDFRenderer),
+            content_negotiation_class=ShoppingCartNegotiation)
     def download_shopping_cart(self, request):
-        shopping_cart = ShoppingList.objects.filter(user=self.request.user)
-        recipes = [item.recipe.id for item in shopping_cart]
-        recipeingredients_list = RecipeIngredients.objects.filter(
-            recipe__in=recipes).values('ingredients').annotate(
-            amount=Sum('amount'))
-        text = 'Список покупок:\n'
-        for item in recipeingredients_list:
-            ingredient = Ingredients.objects.get(pk=item['ingredients'])
-            amount = item['amount']
-            text += (f'{ingredient.name}, {amount} '
-                     f'{ingredient.measurement_units}\n'
-                     )
-        response = HttpResponse(text, content_type="text/plain")
+        ingredients = self.cart_items(request.user).values(
+            'name', 'measurement_units', 'amount')
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients.iterator()),
+            content_type=renderer.media_type
+        )
         response['Content-Disposition'] = (
-            'attachment; filename=shopping_cart.txt')
+            f'attachment; filename={settings.FILE_NAME}.{renderer.format}')
         return response
 
+    @action(detail=False, methods=['get'], url_path='shopping_cart/summary',
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart_summary(self, request):
+        return Response(list(self.cart_items(request.user).values(
+            'id', 'name', 'measurement_units', 'amount')))
+
+    def cart_items(self, user):
+        """Суммы ингредиентов списка покупок пользователя по названию."""
+        return ShoppingCartItem.objects.filter(user=user).annotate(
+            name=F('ingredient__name'),
+            measurement_units=F('ingredient__measurement_units')
+        ).order_by('name')
 
-class IngredientsViewSet(viewsets.ModelViewSet):
+
+class IngredientsViewSet(VersionedViewMixin, viewsets.ModelViewSet):
     queryset = Ingredients.objects.all()
     filter_backends = (filters.SearchFilter,)
     search_fields = ('name', )
@@ -181,22 +317,41 @@ class IngredientsViewSet(viewsets.ModelViewSet):
     permission_classes = (AllowAny,)
     serializer_class = IngredientsSerializer
     pagination_class = None
+    version_names = (INGREDIENTS,)
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        ingredient_query = self.request.query_params.get('name')
-        if ingredient_query:
-            for i in range(1, len(ingredient_query) + 1):
-                ingredient_name = ingredient_query[:i]
-                queryset = queryset.filter(name__istartswith=ingredient_name)
         queryset = queryset.annotate(lower_name=Lower('name'))
         queryset = queryset.order_by('lower_name')
         return queryset
 
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('search'):
+            return super().list(request, *args, **kwargs)
+        ingredient_index.ensure_built(self.versions[INGREDIENTS])
+        ingredient_query = request.query_params.get('name')
+        if ingredient_query:
+            return Response(ingredient_index.search(ingredient_query))
+        return Response(ingredient_index.all())
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(VersionedViewMixin, viewsets.ModelViewSet):
     queryset = Tags.objects.all()
     filter_backends = (DjangoFilterBackend,)
     permission_classes = (AllowAny,)
     serializer_class = TagSerializer
     pagination_class = None
+    version_names = (TAGS,)
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
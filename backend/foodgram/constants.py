@@ -3,3 +3,6 @@ ART_LENGTH = 256
 COLOUR_LENGTH = 9
 USERNAME_PASSWORD_LENGTH = 150
 EMAIL_LENGTH = 254
+RECIPES_LIMIT_MAX = 50
+RECIPES_BATCH_MAX = 100
+SEARCH_CONFIG = 'russian'
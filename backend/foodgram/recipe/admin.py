@@ -1,11 +1,15 @@
 from django.contrib import admin
 from django.core.exceptions import ValidationError
+from django.db.models import Prefetch
+from recipe.cart import cart_users, rebuild_carts
 from recipe.models import (FavoritesList, Ingredients, Recipe,
                            RecipeIngredients, ShoppingList, Subscription, Tags)
 
 
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
 
 
 class RecipeIngredientsInline(admin.TabularInline):
@@ -33,15 +37,21 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     list_editable = ('name',
                      'cooking_time',
-                     'text',
-                     'author')
-    search_fields = ('name', 'author', '_ingredients')
-    list_filter = ('name', 'author', 'tags', 'ingredients')
+                     'text')
+    raw_id_fields = ('author', )
+    search_fields = ('name', 'author__username')
+    list_filter = ('tags', 'pub_date')
+    show_full_result_count = False
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author').prefetch_related(Prefetch(
+                'ingredients', queryset=Ingredients.objects.only('name')))
+
     @admin.display(description='Избранное')
     def in_favorites_list(self, obj):
-        return obj.favoriteslist.count()
+        return obj.favorites_count
 
     def _ingredients(self, row):
         return ', '.join([x.name for x in row.ingredients.all()])
@@ -52,6 +62,11 @@ class RecipeAdmin(admin.ModelAdmin):
         if not form.cleaned_data.get('ingredients'):
             super().save_model(request, obj, form, change)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            rebuild_carts(cart_users(form.instance.id))
+
 
 class TagsAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'color', 'slug')
@@ -59,20 +74,60 @@ class TagsAdmin(admin.ModelAdmin):
 
 class IngredientsAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'measurement_units')
-    list_filter = ('name', )
+    list_filter = ('measurement_units', )
     search_fields = ('name', )
 
 
 class RecipeIngredientsAdmin(admin.ModelAdmin):
+    """Изменения ингредиентов пересобирают списки покупок с рецептом."""
     list_display = ('pk', 'recipe', 'ingredients', 'amount')
+    list_select_related = ('recipe', 'ingredients')
+    raw_id_fields = ('recipe', 'ingredients')
+
+    def rebuild_recipe_carts(self, recipe_ids):
+        rebuild_carts(set(ShoppingList.objects.filter(
+            recipe_id__in=recipe_ids).values_list('user_id', flat=True)))
+
+    def save_model(self, request, obj, form, change):
+        previous_recipe_id = form.initial.get('recipe')
+        super().save_model(request, obj, form, change)
+        self.rebuild_recipe_carts({obj.recipe_id, previous_recipe_id} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.rebuild_recipe_carts([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.rebuild_recipe_carts(recipe_ids)
 
 
 class ShoppingListAdmin(admin.ModelAdmin):
+    """Изменения списков покупок пересобирают суммы ингредиентов."""
     list_display = ('pk', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    raw_id_fields = ('user', 'recipe')
+
+    def save_model(self, request, obj, form, change):
+        previous_user_id = form.initial.get('user')
+        super().save_model(request, obj, form, change)
+        rebuild_carts({obj.user_id, previous_user_id} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        rebuild_carts([obj.user_id])
+
+    def delete_queryset(self, request, queryset):
+        user_ids = set(queryset.values_list('user_id', flat=True))
+        super().delete_queryset(request, queryset)
+        rebuild_carts(user_ids)
 
 
 class FavoritesListAdmin(admin.ModelAdmin):
     list_display = ('pk', 'user')
+    list_select_related = ('user', )
+    raw_id_fields = ('user', 'recipe')
 
 
 admin.site.register(Subscription, SubscriptionAdmin)
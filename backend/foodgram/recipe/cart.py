@@ -0,0 +1,120 @@
+from itertools import islice
+
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+from recipe.models import RecipeIngredients, ShoppingCartItem, ShoppingList
+
+CART_BATCH_SIZE = 1000
+
+
+def recipe_amounts(recipe_ids, sign=1):
+    """Суммарное количество каждого ингредиента рецептов со знаком."""
+    return {
+        ingredient_id: sign * total
+        for ingredient_id, total in RecipeIngredients.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredients_id').annotate(
+            total=Sum('amount')
+        ).values_list('ingredients_id', 'total').order_by()
+    }
+
+
+def apply_deltas(user_ids, deltas):
+    """Меняет суммы ингредиентов в списках покупок пользователей.
+
+    user_ids - список id пользователей, deltas - словарь
+    {id ингредиента: изменение}. Недостающие строки создаются, строки
+    с нулевой суммой удаляются.
+    """
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not deltas:
+        return
+    added = [ingredient_id for ingredient_id, delta in deltas.items()
+             if delta > 0]
+    if added:
+        ShoppingCartItem.objects.bulk_create(
+            (
+                ShoppingCartItem(user_id=user_id, ingredient_id=ingredient_id,
+                                 amount=0)
+                for user_id in user_ids
+                for ingredient_id in added
+            ),
+            batch_size=CART_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+    items = ShoppingCartItem.objects.filter(user_id__in=user_ids)
+    items.filter(ingredient_id__in=deltas).update(amount=Greatest(
+        F('amount') + Case(
+            *[When(ingredient_id=ingredient_id, then=Value(delta))
+              for ingredient_id, delta in deltas.items()],
+            output_field=IntegerField()
+        ),
+        0
+    ))
+    if len(added) < len(deltas):
+        items.filter(
+            ingredient_id__in=[ingredient_id for ingredient_id in deltas
+                               if ingredient_id not in added],
+            amount=0
+        ).delete()
+
+
+def cart_users(recipe_id):
+    return list(ShoppingList.objects.filter(
+        recipe_id=recipe_id).values_list('user_id', flat=True))
+
+
+def add_recipes(user_id, recipe_ids):
+    apply_deltas([user_id], recipe_amounts(recipe_ids))
+
+
+def remove_recipes(user_id, recipe_ids):
+    apply_deltas([user_id], recipe_amounts(recipe_ids, -1))
+
+
+def recipe_changed(recipe_id, deltas):
+    """Переносит изменение ингредиентов рецепта в списки покупок с ним."""
+    if any(deltas.values()):
+        user_ids = cart_users(recipe_id)
+        if user_ids:
+            apply_deltas(user_ids, deltas)
+
+
+def recipe_deleted(recipe_id):
+    user_ids = cart_users(recipe_id)
+    if user_ids:
+        apply_deltas(user_ids, recipe_amounts([recipe_id], -1))
+
+
+def rebuild_carts(user_ids=None, batch_size=CART_BATCH_SIZE):
+    """Пересобирает суммы списков покупок из рецептов в списках.
+
+    Без user_ids пересобираются списки всех пользователей. Возвращает
+    количество созданных строк.
+    """
+    items = ShoppingCartItem.objects.all()
+    carts = ShoppingList.objects.all()
+    if user_ids is not None:
+        items = items.filter(user_id__in=user_ids)
+        carts = carts.filter(user_id__in=user_ids)
+    items.delete()
+    totals = carts.values(
+        'user_id', ingredient_id=F('recipe__recipeingredients__ingredients')
+    ).annotate(
+        total=Sum('recipe__recipeingredients__amount')
+    ).filter(total__gt=0).order_by().iterator()
+    created = 0
+    while True:
+        batch = [
+            ShoppingCartItem(user_id=row['user_id'],
+                             ingredient_id=row['ingredient_id'],
+                             amount=row['total'])
+            for row in islice(totals, batch_size)
+        ]
+        if not batch:
+            return created
+        ShoppingCartItem.objects.bulk_create(batch)
+        created += len(batch)
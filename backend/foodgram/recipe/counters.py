@@ -0,0 +1,50 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from recipe.models import FavoritesList, Recipe, Subscription
+from users.models import User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoritesList, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+
+def change_counter(model, pks, counter, delta):
+    """Атомарно меняет счетчик у строк с указанными pk."""
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{f'{counter}__gte': -delta})
+    queryset.update(**{counter: F(counter) + delta})
+
+
+def actual_count(related_model, field):
+    return Coalesce(Subquery(
+        related_model.objects.filter(**{field: OuterRef('pk')}).order_by()
+        .values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount(model, counter, related_model, field):
+    """Пересчитывает разошедшиеся счетчики, возвращает их количество."""
+    drifted = list(
+        model.objects.annotate(actual=actual_count(related_model, field))
+        .exclude(**{counter: F('actual')}).values_list('pk', flat=True)
+    )
+    if not drifted:
+        return 0
+    return model.objects.filter(pk__in=drifted).update(
+        **{counter: actual_count(related_model, field)})
+
+
+def recount_rows(model, pks, counter, related_model, field):
+    """Пересчитывает счетчик у строк с указанными pk.
+
+    Строки блокируются отдельным запросом до подсчета, поэтому подсчет
+    видит записи параллельных транзакций, завершившихся раньше.
+    """
+    pks = list(model.objects.select_for_update().filter(
+        pk__in=pks).order_by('pk').values_list('pk', flat=True))
+    if pks:
+        model.objects.filter(pk__in=pks).update(
+            **{counter: actual_count(related_model, field)})
@@ -0,0 +1,168 @@
+from itertools import islice
+
+from django.conf import settings
+from recipe.models import FeedEntry, Recipe, Subscription
+from users.models import User
+
+FEED_BATCH_SIZE = 1000
+
+
+def is_celebrity(author_id):
+    """Рецепты авторов с большим числом подписчиков читаются при запросе.
+
+    Счетчик читается из базы: у объекта автора, например у request.user
+    из кэша токенов, он может быть устаревшим.
+    """
+    return User.objects.filter(
+        id=author_id, followers_count__gte=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out(recipe):
+    """Добавляет рецепт в ленты подписчиков автора."""
+    if is_celebrity(recipe.author_id):
+        return
+    followers = Subscription.objects.filter(
+        author_id=recipe.author_id).values_list('user_id', flat=True)
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=recipe.id,
+                      author_id=recipe.author_id, pub_date=recipe.pub_date)
+            for user_id in followers.iterator()
+        ],
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def fan_out_recipes(recipe_ids, batch_size=FEED_BATCH_SIZE):
+    """Добавляет рецепты в ленты подписчиков их авторов пачками.
+
+    То же, что fan_out для каждого рецепта, для рецептов, созданных
+    без сигналов.
+    """
+    recipes = list(Recipe.objects.filter(
+        id__in=recipe_ids,
+        author__followers_count__gt=0,
+        author__followers_count__lt=settings.FEED_FANOUT_LIMIT
+    ).values_list('id', 'author_id', 'pub_date'))
+    if not recipes:
+        return
+    followers = {}
+    for author_id, user_id in Subscription.objects.filter(
+            author_id__in={author_id for _, author_id, _ in recipes}
+    ).values_list('author_id', 'user_id'):
+        followers.setdefault(author_id, []).append(user_id)
+    save_entries((
+        FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                  author_id=author_id, pub_date=pub_date)
+        for recipe_id, author_id, pub_date in recipes
+        for user_id in followers.get(author_id, ())
+    ), batch_size)
+
+
+def save_entries(entries, batch_size=FEED_BATCH_SIZE):
+    """Сохраняет записи ленты из итератора пачками, возвращает их число."""
+    total = 0
+    while True:
+        batch = list(islice(entries, batch_size))
+        if not batch:
+            return total
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        total += len(batch)
+
+
+def backfill(user_id, author_id):
+    """Заполняет ленту подписчика последними рецептами автора."""
+    if is_celebrity(author_id):
+        return
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')[
+            :settings.FEED_BACKFILL_LIMIT]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id, pub_date=pub_date)
+            for recipe_id, pub_date in recipes
+        ],
+        batch_size=FEED_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def remove(user_id, author_id):
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def below_limit(author_id):
+    """Заполняет ленты подписчиков автора, опустившегося ниже порога.
+
+    Пока у автора было FEED_FANOUT_LIMIT подписчиков и больше, его новые
+    рецепты не попадали в ленты, а теперь лента читает его только
+    из записей.
+    """
+    if User.objects.filter(
+            id=author_id,
+            followers_count=settings.FEED_FANOUT_LIMIT - 1).exists():
+        save_entries(author_entries(author_id))
+
+
+def older(queryset, position, id_field):
+    """Строки после позиции (pub_date, id) в порядке убывания."""
+    queryset = queryset.order_by('-pub_date', f'-{id_field}')
+    if position is None:
+        return queryset
+    pub_date, pk = position
+    return queryset.filter(pub_date__lte=pub_date).exclude(
+        pub_date=pub_date, **{f'{id_field}__gte': pk})
+
+
+def feed_recipes(user, recipes, position, count):
+    """До count рецептов ленты пользователя после позиции курсора.
+
+    Записи ленты выбираются по индексу (user, pub_date, recipe), затем
+    загружаются их рецепты. Рецепты авторов с числом подписчиков от
+    FEED_FANOUT_LIMIT читаются отдельным запросом и сливаются по дате.
+    """
+    celebrities = list(User.objects.filter(
+        following__user=user,
+        followers_count__gte=settings.FEED_FANOUT_LIMIT
+    ).values_list('id', flat=True))
+    entries = list(older(
+        FeedEntry.objects.filter(user=user).exclude(
+            author_id__in=celebrities),
+        position, 'recipe_id'
+    ).values_list('recipe_id', flat=True)[:count])
+    found = list(recipes.filter(id__in=entries)) if entries else []
+    if celebrities:
+        found += older(recipes.filter(author_id__in=celebrities),
+                       position, 'id')[:count]
+    found.sort(key=lambda recipe: (recipe.pub_date, recipe.id),
+               reverse=True)
+    return found[:count]
+
+
+def author_entries(author_id):
+    recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id').values_list('id', 'pub_date')[
+            :settings.FEED_BACKFILL_LIMIT])
+    if not recipes:
+        return
+    followers = Subscription.objects.filter(
+        author_id=author_id).values_list('user_id', flat=True)
+    for user_id in followers:
+        for recipe_id, pub_date in recipes:
+            yield FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                            author_id=author_id, pub_date=pub_date)
+
+
+def rebuild_feed(batch_size=FEED_BATCH_SIZE):
+    """Заново заполняет ленты из подписок, возвращает число записей."""
+    FeedEntry.objects.all().delete()
+    authors = User.objects.filter(
+        followers_count__gt=0,
+        followers_count__lt=settings.FEED_FANOUT_LIMIT
+    ).order_by('id').values_list('id', flat=True)
+    return save_entries((
+        entry for author_id in authors for entry in author_entries(author_id)
+    ), batch_size)
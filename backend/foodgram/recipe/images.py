@@ -0,0 +1,75 @@
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+from recipe.models import Recipe, RecipeImage
+
+SAVE_FORMATS = {
+    RecipeImage.JPEG: ('JPEG', {'optimize': True, 'progressive': True}),
+    RecipeImage.WEBP: ('WEBP', {'method': 6}),
+}
+
+
+def pending_recipes():
+    """Рецепты, картинка которых ждет обработки."""
+    return Recipe.objects.filter(image_pending=True)
+
+
+def open_source(recipe):
+    with recipe.image.open('rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def render_variant(source, max_size, image_format):
+    image = source.copy()
+    image.thumbnail(max_size, Image.LANCZOS)
+    pillow_format, options = SAVE_FORMATS[image_format]
+    buffer = BytesIO()
+    image.save(buffer, pillow_format,
+               quality=settings.RECIPE_IMAGE_QUALITY, **options)
+    return image.size, ContentFile(buffer.getvalue())
+
+
+def process_recipe_image(recipe):
+    """Создает уменьшенные варианты картинки рецепта.
+
+    Варианты для предыдущей картинки удаляются вместе с файлами.
+    """
+    source = open_source(recipe)
+    name = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    variants = []
+    for size, max_size in settings.RECIPE_IMAGE_SIZES.items():
+        for image_format in SAVE_FORMATS:
+            (width, height), content = render_variant(
+                source, max_size, image_format)
+            variant = RecipeImage(
+                recipe=recipe,
+                source=recipe.image.name,
+                size=size,
+                format=image_format,
+                width=width,
+                height=height
+            )
+            variant.image.save(
+                f'{name}_{size}.{image_format}', content, save=False)
+            variants.append(variant)
+    outdated = list(RecipeImage.objects.filter(recipe=recipe))
+    with transaction.atomic():
+        RecipeImage.objects.filter(recipe=recipe).delete()
+        RecipeImage.objects.bulk_create(variants)
+        Recipe.objects.filter(
+            id=recipe.id, image=recipe.image.name
+        ).update(image_pending=False)
+    for variant in outdated:
+        variant.image.delete(save=False)
+    return variants
@@ -0,0 +1,84 @@
+from recipe import cart
+from recipe.counters import recount_rows
+from recipe.models import FavoritesList, Recipe, ShoppingList
+from recipe.versions import bump_versions, user_version
+from users.models import User
+
+ADDED = 'added'
+EXISTS = 'exists'
+REMOVED = 'removed'
+MISSING = 'missing'
+NOT_FOUND = 'not_found'
+
+
+def lock_user(user_id):
+    """Пакетные изменения списков одного пользователя идут по очереди.
+
+    Вызывается внутри транзакции, до выборки того, что уже есть в списке.
+    """
+    list(User.objects.select_for_update().filter(
+        id=user_id).values_list('id', flat=True))
+
+
+def split_recipes(model, user_id, recipe_ids):
+    """Найденные рецепты из списка и те из них, что уже есть у пользователя."""
+    found = set(Recipe.objects.filter(
+        id__in=recipe_ids).values_list('id', flat=True))
+    present = set(model.objects.filter(
+        user_id=user_id, recipe_id__in=found).values_list(
+            'recipe_id', flat=True)) if found else set()
+    return found, present
+
+
+def add_recipes(model, user_id, recipe_ids):
+    """Добавляет рецепты в избранное или список покупок одной вставкой.
+
+    bulk_create не отправляет сигналы, поэтому счетчик избранного
+    пересчитывается по добавленным рецептам, а не увеличивается: вставка
+    с ignore_conflicts могла пропустить строки, добавленные параллельно.
+    Возвращает результат для каждого id: added, exists или not_found.
+    """
+    lock_user(user_id)
+    found, present = split_recipes(model, user_id, recipe_ids)
+    added = [recipe_id for recipe_id in recipe_ids
+             if recipe_id in found and recipe_id not in present]
+    if added:
+        model.objects.bulk_create(
+            [model(user_id=user_id, recipe_id=recipe_id)
+             for recipe_id in added],
+            ignore_conflicts=True
+        )
+        if model is FavoritesList:
+            recount_rows(Recipe, added, 'favorites_count', FavoritesList,
+                         'recipe')
+        if model is ShoppingList:
+            cart.add_recipes(user_id, added)
+        bump_versions(user_version(user_id))
+    return {
+        recipe_id: (
+            NOT_FOUND if recipe_id not in found
+            else EXISTS if recipe_id in present else ADDED
+        )
+        for recipe_id in recipe_ids
+    }
+
+
+def remove_recipes(model, user_id, recipe_ids):
+    """Удаляет рецепты из избранного или списка покупок.
+
+    Счетчик избранного и версию пользователя меняют сигналы удаления.
+    Возвращает результат для каждого id: removed, missing или not_found.
+    """
+    lock_user(user_id)
+    found, present = split_recipes(model, user_id, recipe_ids)
+    if present:
+        model.objects.filter(user_id=user_id, recipe_id__in=present).delete()
+        if model is ShoppingList:
+            cart.remove_recipes(user_id, list(present))
+    return {
+        recipe_id: (
+            NOT_FOUND if recipe_id not in found
+            else REMOVED if recipe_id in present else MISSING
+        )
+        for recipe_id in recipe_ids
+    }
@@ -0,0 +1,260 @@
+import json
+from time import perf_counter
+
+from api.budgets import fill
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import (CaptureQueriesContext, setup_test_environment,
+                               teardown_test_environment)
+from recipe import cart
+from recipe.models import (FavoritesList, Ingredients, Recipe, ShoppingList,
+                           Subscription, Tags)
+from rest_framework.test import APIClient
+from users.models import User
+
+BENCHMARK_PASSWORD = 'benchmark-password'
+
+# (название, метод, адрес, авторизация, данные)
+ENDPOINTS = (
+    ('recipes list anonymous', 'get', '/api/recipes/', False, None),
+    ('recipes list', 'get', '/api/recipes/', True, None),
+    ('recipes list deep offset', 'get',
+     '/api/recipes/?limit=6&offset={deep_offset}', True, None),
+    ('recipes keyset page', 'get', '/api/recipes/?cursor=&limit=20',
+     True, None),
+    ('recipes list filtered', 'get',
+     '/api/recipes/?tags={tag_slug}&is_favorited=1', True, None),
+    ('recipes list author', 'get', '/api/recipes/?author={author}',
+     True, None),
+    ('recipes search', 'get', '/api/recipes/?search={search}', True, None),
+    ('recipes feed', 'get', '/api/recipes/feed/?limit=20', True, None),
+    ('recipes retrieve', 'get', '/api/recipes/{recipe}/', True, None),
+    ('download shopping cart', 'get', '/api/recipes/download_shopping_cart/',
+     True, None),
+    ('download shopping cart csv', 'get',
+     '/api/recipes/download_shopping_cart/?format=csv', True, None),
+    ('download shopping cart pdf', 'get',
+     '/api/recipes/download_shopping_cart/?format=pdf', True, None),
+    ('shopping cart summary', 'get', '/api/recipes/shopping_cart/summary/',
+     True, None),
+    ('users list', 'get', '/api/users/', True, None),
+    ('users retrieve', 'get', '/api/users/{author}/', True, None),
+    ('users me', 'get', '/api/users/me/', True, None),
+    ('subscriptions', 'get', '/api/users/subscriptions/?recipes_limit=3',
+     True, None),
+    ('ingredients list', 'get', '/api/ingredients/', False, None),
+    ('ingredients search', 'get', '/api/ingredients/?name={ingredient_name}',
+     False, None),
+    ('ingredients retrieve', 'get', '/api/ingredients/{ingredient}/',
+     False, None),
+    ('tags list', 'get', '/api/tags/', False, None),
+    ('tags retrieve', 'get', '/api/tags/{tag}/', False, None),
+    ('recipes create', 'post', '/api/recipes/', True, {
+        'name': 'Рецепт для замера',
+        'text': 'Описание',
+        'cooking_time': 10,
+        'tags': ['{tag}'],
+        'ingredients': [{'id': '{ingredient}', 'amount': 2}],
+    }),
+    ('recipes update', 'patch', '/api/recipes/{own_recipe}/', True, {
+        'name': 'Обновленный рецепт для замера',
+        'tags': ['{tag}'],
+        'ingredients': [{'id': '{ingredient}', 'amount': 5}],
+    }),
+    ('recipes delete', 'delete', '/api/recipes/{own_recipe}/', True, None),
+    ('favorite add', 'post', '/api/recipes/{other_recipe}/favorite/',
+     True, None),
+    ('favorite remove', 'delete', '/api/recipes/{listed_recipe}/favorite/',
+     True, None),
+    ('shopping cart add', 'post',
+     '/api/recipes/{other_recipe}/shopping_cart/', True, None),
+    ('shopping cart remove', 'delete',
+     '/api/recipes/{listed_recipe}/shopping_cart/', True, None),
+    ('favorite batch add', 'post', '/api/recipes/favorite/batch/', True,
+     {'recipes': ['{other_recipe}', '{next_other_recipe}']}),
+    ('favorite batch remove', 'delete', '/api/recipes/favorite/batch/', True,
+     {'recipes': ['{listed_recipe}', '{next_listed_recipe}']}),
+    ('shopping cart batch add', 'post', '/api/recipes/shopping_cart/batch/',
+     True, {'recipes': ['{other_recipe}', '{next_other_recipe}']}),
+    ('shopping cart batch remove', 'delete',
+     '/api/recipes/shopping_cart/batch/', True,
+     {'recipes': ['{listed_recipe}', '{next_listed_recipe}']}),
+    ('subscribe', 'post', '/api/users/{other_author}/subscribe/', True, None),
+    ('unsubscribe', 'delete', '/api/users/{followed_author}/subscribe/',
+     True, None),
+    ('users create', 'post', '/api/users/', False, {
+        'email': 'benchmark@example.com',
+        'username': 'benchmark',
+        'first_name': 'Замер',
+        'last_name': 'Замеров',
+        'password': BENCHMARK_PASSWORD,
+    }),
+    ('users set password', 'post', '/api/users/set_password/', True, {
+        'new_password': f'new-{BENCHMARK_PASSWORD}',
+        'current_password': BENCHMARK_PASSWORD,
+    }),
+    ('token login', 'post', '/api/auth/token/login/', False, {
+        'email': '{email}',
+        'password': BENCHMARK_PASSWORD,
+    }),
+    ('token logout', 'post', '/api/auth/token/logout/', True, None),
+)
+
+
+def percentile(timings, rank):
+    """Процентиль по ближайшему рангу для отсортированного списка."""
+    index = max(0, min(len(timings) - 1,
+                       round(rank / 100 * len(timings) + 0.5) - 1))
+    return timings[index]
+
+
+class Command(BaseCommand):
+    help = ('Замер времени ответа и количества SQL-запросов эндпоинтов API '
+            'через тестовый клиент, результат в JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument(
+            '--warmup', type=int, default=2,
+            help='Количество прогревочных вызовов, не входящих в замер.')
+        parser.add_argument(
+            '--username',
+            help='Пользователь для запросов с авторизацией, по умолчанию '
+                 'автор с наибольшим количеством рецептов.')
+        parser.add_argument(
+            '--only', action='append', default=[],
+            help='Замерить только эндпоинты, название которых содержит '
+                 'строку. Можно указать несколько раз.')
+        parser.add_argument('--output', help='Файл для результата.')
+
+    def handle(self, *args, **options):
+        endpoints = [
+            endpoint for endpoint in ENDPOINTS
+            if not options['only'] or any(
+                part in endpoint[0] for part in options['only'])
+        ]
+        results = {}
+        setup_test_environment()
+        try:
+            # Данные, которые замер готовит для удаляющих эндпоинтов,
+            # откатываются вместе со всем замером.
+            with transaction.atomic():
+                user, fixture = self.get_fixture(options['username'])
+                anonymous = APIClient()
+                authorized = APIClient()
+                authorized.force_authenticate(user)
+                for name, method, path, auth, data in fill(
+                        endpoints, fixture):
+                    results[name] = self.measure(
+                        authorized if auth else anonymous,
+                        user if auth else None, method, path, data,
+                        options['iterations'], options['warmup'])
+                    self.stderr.write(
+                        f'{name}: p50 {results[name]["p50_ms"]} ms, '
+                        f'{results[name]["queries"]} queries')
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+        report = json.dumps({
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'recipes': fixture['recipes_total'],
+            'endpoints': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+
+    def get_fixture(self, username):
+        authors = User.objects.order_by('-recipes_count', 'id')
+        user = (
+            User.objects.filter(username=username).first() if username
+            else authors.first()
+        )
+        if user is None or not Recipe.objects.exists():
+            raise CommandError(
+                'Нет данных для замера, заполните базу командой seed_data.')
+        other_recipes = list(Recipe.objects.exclude(author=user).exclude(
+            favoriteslist__user=user).exclude(
+                shoppinglist__user=user).order_by('id')[:4])
+        other_authors = list(authors.exclude(id=user.id).exclude(
+            following__user=user)[:2])
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        tag = Tags.objects.annotate(
+            recipes=Count('recipe')).order_by('-recipes').first()
+        ingredient = Ingredients.objects.order_by('id').first()
+        own_recipe = Recipe.objects.filter(author=user).first()
+        if not (len(other_recipes) == 4 and len(other_authors) == 2 and tag
+                and ingredient and own_recipe):
+            raise CommandError(
+                'Недостаточно данных для замера, заполните базу командой '
+                'seed_data.')
+        listed = other_recipes[2:]
+        followed_author, other_author = other_authors
+        FavoritesList.objects.bulk_create(
+            [FavoritesList(user=user, recipe=item) for item in listed])
+        ShoppingList.objects.bulk_create(
+            [ShoppingList(user=user, recipe=item) for item in listed])
+        cart.add_recipes(user.id, [item.id for item in listed])
+        Subscription.objects.create(user=user, author=followed_author)
+        user.set_password(BENCHMARK_PASSWORD)
+        user.save(update_fields=['password'])
+        total = Recipe.objects.count()
+        return user, {
+            'recipe': recipe.id,
+            'own_recipe': own_recipe.id,
+            'other_recipe': other_recipes[0].id,
+            'next_other_recipe': other_recipes[1].id,
+            'listed_recipe': listed[0].id,
+            'next_listed_recipe': listed[1].id,
+            'author': recipe.author_id,
+            'other_author': other_author.id,
+            'followed_author': followed_author.id,
+            'email': user.email,
+            'tag': tag.id,
+            'tag_slug': tag.slug,
+            'ingredient': ingredient.id,
+            'ingredient_name': ingredient.name[:3],
+            'search': recipe.name.split()[0],
+            'deep_offset': max(0, total - 6),
+            'recipes_total': total,
+        }
+
+    def measure(self, client, user, method, path, data, iterations,
+                warmup):
+        """Вызывает эндпоинт несколько раз и возвращает статистику.
+
+        Изменяющие запросы выполняются в точке сохранения, которая
+        откатывается после каждого вызова, вместе с ней из базы
+        перечитывается пользователь клиента.
+        """
+        request = getattr(client, method)
+        timings = []
+        queries = status_code = None
+        for number in range(warmup + iterations):
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    started = perf_counter()
+                    response = request(path, data, format='json')
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                    elapsed = perf_counter() - started
+                transaction.set_rollback(method != 'get')
+            if user is not None and method != 'get':
+                user.refresh_from_db()
+            if number >= warmup:
+                timings.append(elapsed * 1000)
+            queries = len(captured)
+            status_code = response.status_code
+        timings.sort()
+        return {
+            'status': status_code,
+            'queries': queries,
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'mean_ms': round(sum(timings) / len(timings), 2),
+        }
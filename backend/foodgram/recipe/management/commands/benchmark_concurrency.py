@@ -0,0 +1,123 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException
+from itertools import cycle
+from time import monotonic, perf_counter
+from urllib.parse import quote, urlsplit
+
+from django.core.management import BaseCommand, CommandError
+from recipe.management.commands.benchmark_api import percentile
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?cursor=&limit=20',
+    '/api/tags/',
+    '/api/ingredients/?name=са',
+)
+
+
+class Command(BaseCommand):
+    help = ('Пропускная способность запущенного сервера при нескольких '
+            'одновременных клиентах: сравнение WSGI и ASGI.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Адрес запущенного сервера.')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Адрес эндпоинта, можно указать несколько раз.')
+        parser.add_argument(
+            '--concurrency', default='1,8,32',
+            help='Количество одновременных клиентов через запятую.')
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help='Длительность замера для каждого уровня в секундах.')
+        parser.add_argument('--token', help='Токен для авторизации.')
+        parser.add_argument(
+            '--label', default='',
+            help='Метка результата, например wsgi или asgi.')
+        parser.add_argument('--output', help='Файл для результата.')
+
+    def handle(self, *args, **options):
+        target = urlsplit(options['url'])
+        if target.scheme != 'http' or not target.hostname:
+            raise CommandError('Ожидается адрес вида http://host:port.')
+        self.host = target.hostname
+        self.port = target.port or 80
+        self.headers = {'Accept': 'application/json'}
+        if options['token']:
+            self.headers['Authorization'] = f'Token {options["token"]}'
+        paths = [
+            quote(path, safe='/?&=')
+            for path in options['paths'] or DEFAULT_PATHS
+        ]
+        results = []
+        for clients in map(int, options['concurrency'].split(',')):
+            result = self.run_level(paths, clients, options['duration'])
+            self.stderr.write(
+                f'{clients} clients: {result["rps"]} req/s, '
+                f'p50 {result["p50_ms"]} ms, p99 {result["p99_ms"]} ms, '
+                f'errors {result["errors"]}')
+            results.append(result)
+        report = json.dumps({
+            'label': options['label'],
+            'url': options['url'],
+            'paths': paths,
+            'duration': options['duration'],
+            'levels': results,
+        }, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(report)
+        else:
+            self.stdout.write(report)
+
+    def run_level(self, paths, clients, duration):
+        deadline = monotonic() + duration
+        started = monotonic()
+        with ThreadPoolExecutor(clients) as executor:
+            runs = list(executor.map(
+                lambda number: self.client(paths, number, deadline),
+                range(clients)))
+        elapsed = monotonic() - started
+        timings = sorted(timing for run, _ in runs for timing in run)
+        errors = sum(errors for _, errors in runs)
+        if not timings:
+            raise CommandError('Сервер не ответил ни на один запрос.')
+        return {
+            'clients': clients,
+            'requests': len(timings),
+            'errors': errors,
+            'rps': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+        }
+
+    def client(self, paths, number, deadline):
+        """Один клиент с постоянным соединением, запросы по кругу."""
+        connection = HTTPConnection(self.host, self.port, timeout=30)
+        timings = []
+        errors = 0
+        ordered = cycle(paths[number % len(paths):] + paths[:number % len(
+            paths)])
+        try:
+            while monotonic() < deadline:
+                started = perf_counter()
+                try:
+                    connection.request('GET', next(ordered),
+                                       headers=self.headers)
+                    response = connection.getresponse()
+                    response.read()
+                except (OSError, HTTPException):
+                    errors += 1
+                    connection.close()
+                    continue
+                if response.status >= 400:
+                    errors += 1
+                    continue
+                timings.append((perf_counter() - started) * 1000)
+        finally:
+            connection.close()
+        return timings, errors
@@ -0,0 +1,80 @@
+from api.budgets import READ_BUDGETS, WRITE_BUDGETS, create_budget_data, fill
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import (CaptureQueriesContext, setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+class Command(BaseCommand):
+    help = ('Проверка количества SQL-запросов в действиях API и админки. '
+            'Тестовые данные создаются в транзакции и откатываются.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        setup_test_environment()
+        try:
+            with transaction.atomic():
+                failed = self.check_budgets()
+                transaction.set_rollback(True)
+        finally:
+            teardown_test_environment()
+        if failed:
+            raise CommandError(
+                f'Превышен бюджет запросов: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS('Бюджеты запросов соблюдены.'))
+
+    def check_budgets(self):
+        users, fixture = create_budget_data()
+        clients = {None: APIClient()}
+        for key, user in users.items():
+            clients[key] = APIClient()
+            clients[key].force_authenticate(user)
+        clients['token'] = APIClient()
+        clients['token'].credentials(HTTP_AUTHORIZATION=(
+            f'Token {Token.objects.create(user=users["reader"]).key}'))
+        self.admin = Client()
+        self.admin.force_login(users['admin'])
+        self.clients = clients
+        failed = []
+        for name, path, user, first, repeated in fill(READ_BUDGETS, fixture):
+            # Каждое действие откатывается, чтобы первый запрос шел без
+            # документов рецептов, собранных предыдущими.
+            with transaction.atomic():
+                for label, budget in (('first', first),
+                                      ('repeated', repeated)):
+                    case = f'{name} ({label})'
+                    if not self.measure(case, 'get', path, user, None,
+                                        budget):
+                        failed.append(case)
+                transaction.set_rollback(True)
+        for name, method, path, user, data, budget in fill(
+                WRITE_BUDGETS, fixture):
+            with transaction.atomic():
+                if not self.measure(name, method, path, user, data, budget):
+                    failed.append(name)
+                transaction.set_rollback(True)
+        return failed
+
+    def measure(self, name, method, path, user, data, budget):
+        client = self.admin if path.startswith('/admin/') else (
+            self.clients[user])
+        request = getattr(client, method)
+        with CaptureQueriesContext(connection) as queries:
+            response = request(path, data, format='json') if data else (
+                request(path))
+            if response.streaming:
+                b''.join(response.streaming_content)
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{name}: ответ {response.status_code} на {path}')
+        passed = len(queries) <= budget
+        self.stdout.write(
+            f'{"OK  " if passed else "FAIL"} {name}: '
+            f'{len(queries)} / {budget}')
+        if not passed and self.verbosity > 1:
+            for query in queries.captured_queries:
+                self.stdout.write(f'    {query["sql"]}')
+        return passed
@@ -0,0 +1,94 @@
+import json
+from statistics import median
+from time import perf_counter
+
+from api.documents import document_data, render_document
+from api.serializers import recipe_prefetches
+from django.core.management import BaseCommand, CommandError
+from recipe.models import Recipe
+
+
+def serializer_documents(recipe_ids):
+    """Документы через RecipeSerializer.
+
+    Связанные данные те же, что в ответах на создание и изменение рецепта.
+    """
+    recipes = Recipe.objects.filter(id__in=recipe_ids).select_related(
+        'author').prefetch_related(*recipe_prefetches())
+    return {recipe.id: render_document(recipe) for recipe in recipes}
+
+
+def fast_documents(recipe_ids):
+    return {
+        recipe_id: json.dumps(data, ensure_ascii=False)
+        for recipe_id, data in document_data(recipe_ids).items()
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сверка документов рецептов, собранных из values(), '
+            'с RecipeSerializer и замер скорости обоих способов.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество рецептов в одной пачке сверки.')
+        parser.add_argument(
+            '--page-size', type=int, default=100,
+            help='Количество рецептов в замере скорости.')
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Количество повторов замера.')
+        parser.add_argument(
+            '--no-parity', action='store_true',
+            help='Только замер, без сверки всех рецептов.')
+
+    def handle(self, *args, **options):
+        if not options['no_parity']:
+            self.check_parity(options['batch_size'])
+        self.benchmark(options['page_size'], options['repeat'])
+
+    def check_parity(self, batch_size):
+        last_id = 0
+        total = 0
+        mismatched = []
+        while True:
+            recipe_ids = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not recipe_ids:
+                break
+            expected = serializer_documents(recipe_ids)
+            actual = fast_documents(recipe_ids)
+            mismatched.extend(
+                recipe_id for recipe_id in recipe_ids
+                if expected.get(recipe_id) != actual.get(recipe_id)
+            )
+            total += len(recipe_ids)
+            last_id = recipe_ids[-1]
+        if mismatched:
+            raise CommandError(
+                f'Документы отличаются у {len(mismatched)} из {total} '
+                f'рецептов: {", ".join(map(str, mismatched[:20]))}')
+        self.stdout.write(f'Документы совпадают: {total} рецептов.')
+
+    def benchmark(self, page_size, repeat):
+        recipe_ids = list(Recipe.objects.order_by('-pub_date', '-id')
+                          .values_list('id', flat=True)[:page_size])
+        if not recipe_ids:
+            raise CommandError('Нет рецептов для замера.')
+        timings = {}
+        for name, build in (('serializer', serializer_documents),
+                            ('values', fast_documents)):
+            runs = []
+            for _ in range(repeat):
+                started = perf_counter()
+                build(recipe_ids)
+                runs.append((perf_counter() - started) * 1000)
+            timings[name] = median(runs)
+            self.stdout.write(
+                f'{name}: {timings[name]:.1f} мс на {len(recipe_ids)} '
+                f'рецептов')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {timings["serializer"] / timings["values"]:.1f}x'))
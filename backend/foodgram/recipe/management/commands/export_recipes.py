@@ -0,0 +1,75 @@
+import json
+import sys
+from itertools import islice
+from time import monotonic
+
+from django.core.management import BaseCommand
+from django.db.models import Prefetch, prefetch_related_objects
+from recipe.models import Recipe, RecipeIngredients
+
+
+def recipe_record(recipe):
+    """Рецепт в виде словаря для одной строки NDJSON."""
+    return {
+        'name': recipe.name,
+        'text': recipe.text,
+        'cooking_time': recipe.cooking_time,
+        'pub_date': recipe.pub_date.isoformat(),
+        'image': recipe.image.name or None,
+        'author': recipe.author.username,
+        'tags': [
+            {'name': tag.name, 'color': tag.color, 'slug': tag.slug}
+            for tag in recipe.tags.all()
+        ],
+        'ingredients': [
+            {
+                'name': row.ingredients.name,
+                'measurement_units': row.ingredients.measurement_units,
+                'amount': row.amount,
+            }
+            for row in recipe.recipeingredients.all()
+        ],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Выгрузка рецептов с ингредиентами, тегами и автором в NDJSON: '
+            'один рецепт в строке.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество рецептов в одной пачке связанных данных.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        started = monotonic()
+        recipes = Recipe.objects.select_related('author').defer(
+            'search_vector').order_by('id').iterator(chunk_size=batch_size)
+        output = (open(options['output'], 'w', encoding='utf-8')
+                  if options['output'] else sys.stdout)
+        total = 0
+        try:
+            while True:
+                batch = list(islice(recipes, batch_size))
+                if not batch:
+                    break
+                prefetch_related_objects(batch, 'tags', Prefetch(
+                    'recipeingredients',
+                    queryset=RecipeIngredients.objects.select_related(
+                        'ingredients').order_by('id')))
+                output.writelines(
+                    json.dumps(recipe_record(recipe), ensure_ascii=False)
+                    + '\n'
+                    for recipe in batch
+                )
+                total += len(batch)
+        finally:
+            if options['output']:
+                output.close()
+        elapsed = monotonic() - started
+        self.stderr.write(
+            f'Выгружено рецептов: {total}, время: {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else total:.0f} рецептов/с).')
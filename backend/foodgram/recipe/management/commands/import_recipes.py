@@ -0,0 +1,225 @@
+import json
+from itertools import islice
+from time import monotonic
+
+from django.core.management import BaseCommand, CommandError, call_command
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+from recipe.cart import rebuild_carts
+from recipe.counters import COUNTERS, recount
+from recipe.feed import fan_out_recipes
+from recipe.models import (FeedEntry, Ingredients, Recipe, RecipeDocument,
+                           RecipeIngredients, ShoppingList, Tags)
+from recipe.versions import INGREDIENTS, RECIPES, TAGS, bump_versions
+from users.models import User
+
+RECIPE_FIELDS = ('author', 'text', 'cooking_time', 'image', 'image_pending',
+                 'pub_date')
+
+
+def read_records(file):
+    for number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as error:
+            raise CommandError(f'Строка {number}: {error}')
+
+
+class Command(BaseCommand):
+    help = ('Загрузка рецептов из NDJSON, выгруженного export_recipes. '
+            'Рецепты с тем же названием обновляются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл NDJSON с рецептами.')
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество рецептов в одной пачке.')
+        parser.add_argument(
+            '--documents', action='store_true',
+            help='Сразу собрать документы рецептов.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        self.stats = dict.fromkeys(
+            ('created', 'updated', 'skipped', 'tags', 'ingredients'), 0)
+        started = monotonic()
+        with open(options['path'], 'r', encoding='utf-8') as file:
+            records = read_records(file)
+            with transaction.atomic():
+                while True:
+                    batch = list(islice(records, options['batch_size']))
+                    if not batch:
+                        break
+                    self.import_batch(batch)
+                self.after_import()
+        if options['documents']:
+            call_command('rebuild_recipe_documents', stdout=self.stdout)
+        elapsed = monotonic() - started
+        stats = self.stats
+        total = stats['created'] + stats['updated']
+        self.stdout.write(
+            f'Создано рецептов: {stats["created"]}, '
+            f'обновлено: {stats["updated"]}, '
+            f'пропущено: {stats["skipped"]}, '
+            f'новых тегов: {stats["tags"]}, '
+            f'новых ингредиентов: {stats["ingredients"]}, '
+            f'время: {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else total:.0f} рецептов/с).'
+        )
+        self.stdout.write(self.style.SUCCESS('Рецепты загружены.'))
+
+    def import_batch(self, records):
+        authors = dict(User.objects.filter(
+            username__in={record['author'] for record in records}
+        ).values_list('username', 'id'))
+        unknown = [record for record in records
+                   if record['author'] not in authors]
+        for record in unknown:
+            self.stderr.write(
+                f'Рецепт "{record["name"]}" пропущен: нет пользователя '
+                f'{record["author"]}.')
+        self.stats['skipped'] += len(unknown)
+        records = list({
+            record['name']: record for record in records
+            if record['author'] in authors
+        }.values())
+        if not records:
+            return
+        tags = self.get_tags(records)
+        ingredients = self.get_ingredients(records)
+        recipes, updated, moved = self.save_recipes(records, authors)
+        if updated:
+            Recipe.tags.through.objects.filter(
+                recipe_id__in=updated).delete()
+            RecipeIngredients.objects.filter(recipe_id__in=updated).delete()
+        Recipe.tags.through.objects.bulk_create([
+            Recipe.tags.through(recipe_id=recipe.id,
+                                tags_id=tags[tag['slug']])
+            for recipe, record in zip(recipes, records)
+            for tag in {tag['slug']: tag for tag in record['tags']}.values()
+        ])
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(
+                recipe_id=recipe.id,
+                ingredients_id=ingredients[
+                    item['name'], item['measurement_units']],
+                amount=item['amount'])
+            for recipe, record in zip(recipes, records)
+            for item in record['ingredients']
+        ])
+        if updated:
+            RecipeDocument.objects.filter(recipe_id__in=updated).delete()
+            rebuild_carts(ShoppingList.objects.filter(
+                recipe_id__in=updated).values_list('user_id', flat=True))
+        if moved:
+            FeedEntry.objects.filter(recipe_id__in=moved).delete()
+        fan_out_recipes(
+            list({recipe.id for recipe in recipes} - set(updated)) + moved)
+        if self.verbosity > 1:
+            self.stdout.write(f'Обработано рецептов: {len(records)}')
+
+    def get_tags(self, records):
+        """Теги пачки по slug, недостающие создаются."""
+        wanted = {
+            tag['slug']: tag for record in records for tag in record['tags']
+        }
+        tags = dict(Tags.objects.filter(
+            slug__in=wanted).values_list('slug', 'id'))
+        missing = [Tags(name=tag['name'], color=tag['color'], slug=slug)
+                   for slug, tag in wanted.items() if slug not in tags]
+        if missing:
+            Tags.objects.bulk_create(missing, ignore_conflicts=True)
+            tags = dict(Tags.objects.filter(
+                slug__in=wanted).values_list('slug', 'id'))
+            self.stats['tags'] += len(missing)
+        if len(tags) < len(wanted):
+            raise CommandError(
+                'Не удалось создать теги: '
+                f'{", ".join(sorted(set(wanted) - set(tags)))}.')
+        return tags
+
+    def get_ingredients(self, records):
+        """Ингредиенты пачки по (name, measurement_units)."""
+        wanted = {
+            (item['name'], item['measurement_units'])
+            for record in records for item in record['ingredients']
+        }
+
+        def existing():
+            return {
+                (name, units): ingredient_id
+                for ingredient_id, name, units in Ingredients.objects.filter(
+                    name__in={name for name, _ in wanted}
+                ).values_list('id', 'name', 'measurement_units')
+                if (name, units) in wanted
+            }
+
+        ingredients = existing()
+        missing = wanted - set(ingredients)
+        if missing:
+            Ingredients.objects.bulk_create(
+                [Ingredients(name=name, measurement_units=units)
+                 for name, units in missing],
+                ignore_conflicts=True)
+            ingredients = existing()
+            self.stats['ingredients'] += len(missing)
+        return ingredients
+
+    def save_recipes(self, records, authors):
+        """Создает и обновляет рецепты пачки.
+
+        Возвращает рецепты в порядке записей, id обновленных и id тех
+        из них, у которых сменились автор или дата: их записи лент
+        устарели.
+        """
+        existing = {
+            row[0]: row[1:]
+            for row in Recipe.objects.filter(
+                name__in=[record['name'] for record in records]
+            ).values_list('name', 'id', 'image', 'image_pending',
+                          'author_id', 'pub_date')
+        }
+        recipes = []
+        moved = []
+        for record in records:
+            recipe_id, image, pending, author_id, pub_date = existing.get(
+                record['name'], (None, None, False, None, None))
+            recipe = Recipe(
+                id=recipe_id,
+                name=record['name'],
+                author_id=authors[record['author']],
+                text=record['text'],
+                cooking_time=record['cooking_time'],
+                image=record['image'] or None,
+                image_pending=bool(record['image']) and (
+                    pending or record['image'] != (image or '')),
+                pub_date=parse_datetime(record['pub_date'])
+            )
+            if recipe_id and (recipe.author_id != author_id
+                              or recipe.pub_date != pub_date):
+                moved.append(recipe_id)
+            recipes.append(recipe)
+        new = [recipe for recipe in recipes if recipe.id is None]
+        if new:
+            # auto_now_add заменяет pub_date при вставке, дата из записи
+            # возвращается следующим bulk_update.
+            Recipe.objects.bulk_create(new)
+            created = dict(Recipe.objects.filter(
+                name__in=[recipe.name for recipe in new]
+            ).values_list('name', 'id'))
+            for recipe in new:
+                recipe.id = created[recipe.name]
+            for recipe, record in zip(recipes, records):
+                recipe.pub_date = parse_datetime(record['pub_date'])
+        Recipe.objects.bulk_update(recipes, RECIPE_FIELDS)
+        self.stats['created'] += len(new)
+        self.stats['updated'] += len(existing)
+        return recipes, [row[0] for row in existing.values()], moved
+
+    def after_import(self):
+        """То, что при сохранении по одному делают сигналы."""
+        for model, counter, related_model, field in COUNTERS:
+            recount(model, counter, related_model, field)
+        bump_versions(RECIPES, TAGS, INGREDIENTS)
@@ -1,25 +1,158 @@
 import csv
+import io
+import json
+import os
+from time import monotonic
 
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
 from foodgram import settings
 from recipe.models import Ingredients
+from recipe.versions import INGREDIENTS, bump_versions
+
+JSON_CHUNK_SIZE = 64 * 1024
+UNIQUE_CONSTRAINT = 'name_measurement_units'
+
+
+def read_csv(file):
+    for row in csv.reader(file, delimiter=','):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Читает JSON-массив ингредиентов по частям, не загружая его целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов.')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise CommandError('Файл JSON обрывается.')
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item['name'], item['measurement_unit']
+
+
+class CSVStream(io.RawIOBase):
+    """Файлоподобный объект с CSV из строк для COPY FROM STDIN."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.buffer = b''
+        self.count = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.count += 1
+            line = io.StringIO()
+            csv.writer(line, lineterminator='\n').writerow(row)
+            self.buffer += line.getvalue().encode()
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
 
 
 class Command(BaseCommand):
     help = 'Загрузка ингредиентов в базу данных.'
 
-    def handle(self, *args, **kwargs):
-        data_path = settings.BASE_DIR
-        with open(f'{data_path}/data/ingredients.csv',
-                  'r', encoding='utf-8') as file:
-            csv_reader = csv.reader(file, delimiter=',')
-            for row in csv_reader:
-                _, created = Ingredients.objects.get_or_create(
-                    name=row[0],
-                    defaults={'measurement_units': row[1]}
-                )
-                if created:
-                    self.stdout.write(f'Создан ингредиент: {row[0]}')
-                else:
-                    self.stdout.write(f'Ингредиент {row[0]} уже существует')
-            self.stdout.write(self.style.SUCCESS('Данные успешно загружены.'))
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'data', 'ingredients.csv'),
+            help='Файл с ингредиентами (.csv или .json).')
+        parser.add_argument(
+            '--format', choices=('csv', 'json'),
+            help='Формат файла, по умолчанию определяется по расширению.')
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество ингредиентов в одной вставке.')
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='Не использовать COPY даже на PostgreSQL.')
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        path = options['path']
+        file_format = options['format'] or os.path.splitext(
+            path)[1].lstrip('.').lower()
+        readers = {'csv': read_csv, 'json': read_json}
+        if file_format not in readers:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+        started = monotonic()
+        before = Ingredients.objects.count()
+        with open(path, 'r', encoding='utf-8') as file:
+            rows = readers[file_format](file)
+            if connection.vendor == 'postgresql' and not options['no_copy']:
+                total = self.copy(rows)
+            else:
+                total = self.bulk_insert(rows, options['batch_size'])
+        created = Ingredients.objects.count() - before
+        if created:
+            bump_versions(INGREDIENTS)
+        elapsed = monotonic() - started
+        self.stdout.write(
+            f'Прочитано: {total}, создано: {created}, '
+            f'пропущено: {total - created}, '
+            f'время: {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else total:.0f} строк/с).'
+        )
+        self.stdout.write(self.style.SUCCESS('Данные успешно загружены.'))
+
+    def bulk_insert(self, rows, batch_size):
+        total = 0
+        batch = []
+        for name, measurement_units in rows:
+            batch.append(Ingredients(
+                name=name, measurement_units=measurement_units))
+            if len(batch) >= batch_size:
+                total += self.insert_batch(batch)
+                batch = []
+        if batch:
+            total += self.insert_batch(batch)
+        return total
+
+    def insert_batch(self, batch):
+        Ingredients.objects.bulk_create(batch, ignore_conflicts=True)
+        if self.verbosity > 1:
+            self.stdout.write(f'Обработано ингредиентов: {len(batch)}')
+        return len(batch)
+
+    @transaction.atomic
+    def copy(self, rows):
+        """Загрузка через COPY во временную таблицу и INSERT ON CONFLICT."""
+        table = Ingredients._meta.db_table
+        stream = CSVStream(rows)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMP TABLE ingredients_staging '
+                '(name text, measurement_units text) ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredients_staging (name, measurement_units) '
+                'FROM STDIN WITH (FORMAT csv)',
+                stream
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_units) '
+                f'SELECT DISTINCT name, measurement_units '
+                f'FROM ingredients_staging '
+                f'ON CONFLICT ON CONSTRAINT {UNIQUE_CONSTRAINT} DO NOTHING'
+            )
+        return stream.count
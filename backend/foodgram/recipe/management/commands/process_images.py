@@ -0,0 +1,43 @@
+from time import sleep
+
+from api.documents import schedule_rebuild
+from django.core.management import BaseCommand
+from recipe.images import pending_recipes, process_recipe_image
+
+
+class Command(BaseCommand):
+    help = 'Обработка загруженных картинок рецептов вне запросов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Работать постоянно, проверяя очередь каждые --interval с.')
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проверками очереди в секундах.')
+        parser.add_argument(
+            '--batch-size', type=int, default=20,
+            help='Количество рецептов за один проход.')
+
+    def handle(self, *args, **options):
+        failed = set()
+        while True:
+            recipes = list(pending_recipes().exclude(
+                image__in=failed).order_by('id')[:options['batch_size']])
+            for recipe in recipes:
+                try:
+                    process_recipe_image(recipe)
+                except OSError as error:
+                    failed.add(recipe.image.name)
+                    self.stderr.write(
+                        f'Не удалось обработать картинку рецепта '
+                        f'{recipe.id}: {error}')
+                    continue
+                schedule_rebuild([recipe.id])
+                self.stdout.write(f'Обработана картинка рецепта {recipe.id}')
+            if recipes:
+                continue
+            if not options['loop']:
+                break
+            sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS('Очередь картинок обработана.'))
@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from recipe.feed import rebuild_feed
+
+
+class Command(BaseCommand):
+    help = 'Пересборка лент подписок из подписок и рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество записей ленты в одной вставке.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_feed(options['batch_size'])
+        self.stdout.write(f'Записей в лентах: {total}')
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны.'))
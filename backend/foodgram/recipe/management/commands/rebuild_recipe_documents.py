@@ -0,0 +1,31 @@
+from api.documents import rebuild_documents
+from django.core.management import BaseCommand
+from recipe.models import Recipe
+from recipe.versions import RECIPES, bump_versions
+
+
+class Command(BaseCommand):
+    help = 'Пересборка сохраненных документов рецептов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Количество рецептов в одной пачке.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        total = 0
+        while True:
+            recipe_ids = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not recipe_ids:
+                break
+            total += len(rebuild_documents(recipe_ids))
+            last_id = recipe_ids[-1]
+            self.stdout.write(f'Пересобрано документов: {total}')
+        bump_versions(RECIPES)
+        self.stdout.write(
+            self.style.SUCCESS('Документы рецептов пересобраны.'))
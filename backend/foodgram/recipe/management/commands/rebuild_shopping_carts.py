@@ -0,0 +1,18 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+from recipe.cart import rebuild_carts
+
+
+class Command(BaseCommand):
+    help = 'Пересборка сумм ингредиентов списков покупок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одной вставке.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild_carts(batch_size=options['batch_size'])
+        self.stdout.write(f'Строк в списках покупок: {total}')
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересобраны.'))
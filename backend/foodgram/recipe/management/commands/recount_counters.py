@@ -0,0 +1,14 @@
+from django.core.management import BaseCommand
+from recipe.counters import COUNTERS, recount
+
+
+class Command(BaseCommand):
+    help = 'Пересчет разошедшихся счетчиков избранного и подписок.'
+
+    def handle(self, *args, **options):
+        for model, counter, related_model, field in COUNTERS:
+            fixed = recount(model, counter, related_model, field)
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}.{counter}: '
+                f'исправлено {fixed}')
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны.'))
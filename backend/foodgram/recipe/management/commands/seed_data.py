@@ -0,0 +1,197 @@
+import random
+from itertools import accumulate
+from time import monotonic
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import BaseCommand, call_command
+from django.db import transaction
+from recipe.cart import rebuild_carts
+from recipe.counters import COUNTERS, recount
+from recipe.feed import rebuild_feed
+from recipe.models import (FavoritesList, Ingredients, Recipe,
+                           RecipeIngredients, ShoppingList, Subscription, Tags)
+from recipe.versions import INGREDIENTS, RECIPES, TAGS, bump_versions
+from users.models import User
+
+WORDS = (
+    'суп', 'борщ', 'салат', 'пирог', 'каша', 'рагу', 'омлет', 'блины',
+    'котлеты', 'плов', 'паста', 'запеканка', 'жаркое', 'сырники', 'уха',
+    'томатный', 'грибной', 'куриный', 'овощной', 'сливочный', 'острый',
+    'домашний', 'быстрый', 'летний', 'зимний', 'с сыром', 'с зеленью',
+)
+SEED_PASSWORD = 'seed-password'
+SKEW = 1.1
+
+
+def skewed_weights(size):
+    """Накопленные веса распределения Ципфа: первые элементы популярнее."""
+    return list(accumulate(1 / (rank ** SKEW) for rank in range(1, size + 1)))
+
+
+def unique_pairs(rng, left, right, weights, count):
+    """Уникальные пары (left, right), правые элементы выбираются с перекосом.
+
+    Возвращает меньше count пар, если столько уникальных пар не набрать.
+    """
+    pairs = set()
+    attempts = count * 5
+    while len(pairs) < count and attempts:
+        attempts -= 1
+        pairs.add((
+            rng.choice(left),
+            rng.choices(right, cum_weights=weights)[0]
+        ))
+    return pairs
+
+
+class Command(BaseCommand):
+    help = ('Заполнение базы синтетическими пользователями, рецептами, '
+            'избранным, списками покупок и подписками.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--cart', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8,
+            help='Максимальное количество ингредиентов в рецепте.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Зерно генератора для воспроизводимых данных.')
+        parser.add_argument(
+            '--documents', action='store_true',
+            help='Сразу собрать документы рецептов.')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = uuid4().hex[:6]
+        started = monotonic()
+        with transaction.atomic():
+            users = self.create_users(options['users'])
+            tags = self.create_tags(options['tags'])
+            ingredients = self.get_ingredients()
+            recipes = self.create_recipes(
+                users, tags, ingredients, options['recipes'],
+                options['ingredients_per_recipe'])
+            recipe_weights = skewed_weights(len(recipes))
+            self.create_pairs(
+                FavoritesList, 'recipe_id', users, recipes, recipe_weights,
+                options['favorites'])
+            self.create_pairs(
+                ShoppingList, 'recipe_id', users, recipes, recipe_weights,
+                options['cart'])
+            self.create_subscriptions(users, options['subscriptions'])
+            for model, counter, related_model, field in COUNTERS:
+                recount(model, counter, related_model, field)
+            bump_versions(RECIPES, TAGS, INGREDIENTS)
+            rebuild_feed(self.batch_size)
+            rebuild_carts(batch_size=self.batch_size)
+        if options['documents']:
+            call_command('rebuild_recipe_documents', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {monotonic() - started:.1f} с.'))
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, ignore_conflicts=True)
+        label = ('Теги рецептов' if model._meta.auto_created
+                 else model._meta.verbose_name_plural)
+        self.stdout.write(f'{label}: {len(objects)}')
+
+    def create_users(self, count):
+        password = make_password(SEED_PASSWORD)
+        self.bulk_create(User, [
+            User(
+                username=f'seed_{self.prefix}_{number}',
+                email=f'seed_{self.prefix}_{number}@example.com',
+                first_name=f'Имя {number}',
+                last_name=f'Фамилия {number}',
+                password=password
+            )
+            for number in range(count)
+        ])
+        return list(User.objects.filter(
+            username__startswith=f'seed_{self.prefix}_'
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_tags(self, count):
+        self.bulk_create(Tags, [
+            Tags(
+                name=f'Тег {self.prefix} {number}',
+                color='#{:06x}'.format(self.rng.randrange(0x1000000)),
+                slug=f'seed-{self.prefix}-{number}'
+            )
+            for number in range(count)
+        ])
+        return list(Tags.objects.filter(
+            slug__startswith=f'seed-{self.prefix}-'
+        ).values_list('id', flat=True))
+
+    def get_ingredients(self):
+        ingredients = list(Ingredients.objects.values_list('id', flat=True))
+        if ingredients:
+            return ingredients
+        self.bulk_create(Ingredients, [
+            Ingredients(name=f'ингредиент {number}', measurement_units='г')
+            for number in range(500)
+        ])
+        return list(Ingredients.objects.values_list('id', flat=True))
+
+    def create_recipes(self, users, tags, ingredients, count,
+                       ingredients_per_recipe):
+        author_weights = skewed_weights(len(users))
+        self.bulk_create(Recipe, [
+            Recipe(
+                author_id=self.rng.choices(
+                    users, cum_weights=author_weights)[0],
+                name=(f'{" ".join(self.rng.sample(WORDS, 3)).capitalize()} '
+                      f'{self.prefix}-{number}'),
+                text=' '.join(self.rng.choices(WORDS, k=40)),
+                cooking_time=self.rng.randint(1, 240)
+            )
+            for number in range(count)
+        ])
+        recipes = list(Recipe.objects.filter(
+            name__contains=f' {self.prefix}-'
+        ).order_by('id').values_list('id', flat=True))
+        self.rng.shuffle(recipes)
+        tag_links = []
+        recipe_ingredients = []
+        for recipe_id in recipes:
+            for tag_id in self.rng.sample(
+                    tags, self.rng.randint(1, min(3, len(tags)))):
+                tag_links.append(Recipe.tags.through(
+                    recipe_id=recipe_id, tags_id=tag_id))
+            for ingredient_id in self.rng.sample(
+                    ingredients,
+                    self.rng.randint(
+                        1, min(ingredients_per_recipe, len(ingredients)))):
+                recipe_ingredients.append(RecipeIngredients(
+                    recipe_id=recipe_id,
+                    ingredients_id=ingredient_id,
+                    amount=self.rng.randint(1, 500)
+                ))
+        self.bulk_create(Recipe.tags.through, tag_links)
+        self.bulk_create(RecipeIngredients, recipe_ingredients)
+        return recipes
+
+    def create_pairs(self, model, field, users, recipes, weights, count):
+        self.bulk_create(model, [
+            model(user_id=user_id, **{field: recipe_id})
+            for user_id, recipe_id in unique_pairs(
+                self.rng, users, recipes, weights, count)
+        ])
+
+    def create_subscriptions(self, users, count):
+        self.bulk_create(Subscription, [
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id, author_id in unique_pairs(
+                self.rng, users, users, skewed_weights(len(users)), count)
+            if user_id != author_id
+        ])
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:03
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0009_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=256, verbose_name='Исходная картинка')),
+                ('size', models.CharField(choices=[('card', 'Карточка'), ('detail', 'Страница рецепта')], max_length=10, verbose_name='Размер')),
+                ('format', models.CharField(choices=[('jpeg', 'JPEG'), ('webp', 'WebP')], max_length=10, verbose_name='Формат')),
+                ('image', models.ImageField(height_field='height', upload_to='recipe/variants/', verbose_name='Картинка', width_field='width')),
+                ('width', models.PositiveIntegerField(verbose_name='Ширина')),
+                ('height', models.PositiveIntegerField(verbose_name='Высота')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='recipe.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Вариант картинки рецепта',
+                'verbose_name_plural': 'Варианты картинок рецептов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='recipeimage',
+            constraint=models.UniqueConstraint(fields=('recipe', 'size', 'format'), name='unique_recipe_image_variant'),
+        ),
+    ]
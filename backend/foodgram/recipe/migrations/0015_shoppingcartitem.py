@@ -0,0 +1,54 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:27
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum
+import django.db.models.deletion
+
+
+def fill_carts(apps, schema_editor):
+    ShoppingList = apps.get_model('recipe', 'ShoppingList')
+    ShoppingCartItem = apps.get_model('recipe', 'ShoppingCartItem')
+    totals = ShoppingList.objects.values(
+        'user_id', ingredient_id=F('recipe__recipeingredients__ingredients')
+    ).annotate(
+        total=Sum('recipe__recipeingredients__amount')
+    ).filter(total__gt=0).order_by()
+    ShoppingCartItem.objects.bulk_create(
+        [
+            ShoppingCartItem(user_id=row['user_id'],
+                             ingredient_id=row['ingredient_id'],
+                             amount=row['total'])
+            for row in totals.iterator()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipe', '0014_feedentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to='recipe.ingredients', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_items', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент списка покупок',
+                'verbose_name_plural': 'Ингредиенты списков покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart_item'),
+        ),
+        migrations.RunPython(fill_carts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.3 on 2026-10-17 04:46
+
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def fill_pending(apps, schema_editor):
+    Recipe = apps.get_model('recipe', 'Recipe')
+    RecipeImage = apps.get_model('recipe', 'RecipeImage')
+    Recipe.objects.exclude(image='').exclude(image=None).filter(
+        ~Exists(RecipeImage.objects.filter(
+            recipe=OuterRef('pk'), source=OuterRef('image')))
+    ).update(image_pending=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipe', '0015_shoppingcartitem'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_pending',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Картинка ждет обработки'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('image_pending', True)), fields=['id'], name='recipe_image_pending_idx'),
+        ),
+        migrations.RunPython(fill_pending, migrations.RunPython.noop),
+    ]
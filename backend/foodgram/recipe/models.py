@@ -1,8 +1,11 @@
 from api.validators import validate_time
 from colorfield.fields import ColorField
-from constants import COLOUR_LENGTH, SLUG_NAME_LENGTH
+from constants import ART_LENGTH, COLOUR_LENGTH, SLUG_NAME_LENGTH
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from users.models import User
 
 
@@ -94,6 +97,25 @@ class Ingredients(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def latest_by_author(self, author_ids, limit):
+        """Последние limit рецептов каждого автора одним запросом."""
+        if not author_ids:
+            return self.none()
+        ranked = self.filter(author_id__in=author_ids).annotate(
+            author_rank=models.Window(
+                expression=RowNumber(),
+                partition_by=models.F('author_id'),
+                order_by=(models.F('pub_date').desc(),
+                          models.F('id').desc()))
+        ).order_by().values('id', 'author_rank')
+        sql, params = ranked.query.sql_with_params()
+        return self.filter(id__in=RawSQL(
+            f'SELECT id FROM ({sql}) AS ranked WHERE author_rank <= %s',
+            (*params, limit)))
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(User,
                                on_delete=models.CASCADE,
@@ -111,6 +133,11 @@ class Recipe(models.Model):
                               null=True,
                               default=None
                               )
+    image_pending = models.BooleanField(
+        'Картинка ждет обработки',
+        default=False,
+        editable=False
+    )
     text = models.TextField('Описание',
                             blank=True,
                             null=True)
@@ -132,15 +159,42 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='recipe_pub_date_id_idx'),
+            models.Index(fields=['id'],
+                         name='recipe_image_pending_idx',
+                         condition=models.Q(image_pending=True))
+        ]
 
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.loaded_author_id = instance.__dict__.get('author_id')
+        if 'image' in instance.__dict__:
+            instance.loaded_image = instance.__dict__['image'] or ''
+        return instance
+
 
 class RecipeIngredients(models.Model):
     recipe = models.ForeignKey(
@@ -167,6 +221,74 @@ class RecipeIngredients(models.Model):
         return f'{self.recipe} {self.ingredients}'
 
 
+class RecipeImage(models.Model):
+    CARD = 'card'
+    DETAIL = 'detail'
+    SIZES = (
+        (CARD, 'Карточка'),
+        (DETAIL, 'Страница рецепта'),
+    )
+    JPEG = 'jpeg'
+    WEBP = 'webp'
+    FORMATS = (
+        (JPEG, 'JPEG'),
+        (WEBP, 'WebP'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='images',
+        verbose_name='Рецепт'
+    )
+    source = models.CharField(
+        'Исходная картинка',
+        max_length=ART_LENGTH
+    )
+    size = models.CharField('Размер', max_length=10, choices=SIZES)
+    format = models.CharField('Формат', max_length=10, choices=FORMATS)
+    image = models.ImageField(
+        'Картинка',
+        upload_to='recipe/variants/',
+        width_field='width',
+        height_field='height'
+    )
+    width = models.PositiveIntegerField('Ширина')
+    height = models.PositiveIntegerField('Высота')
+
+    class Meta:
+        verbose_name = 'Вариант картинки рецепта'
+        verbose_name_plural = 'Варианты картинок рецептов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'size', 'format'],
+                name='unique_recipe_image_variant'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} {self.size} {self.format}'
+
+
+class RecipeDocument(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='document',
+        verbose_name='Рецепт'
+    )
+    document = models.TextField('Документ рецепта в JSON')
+    updated = models.DateTimeField('Дата обновления', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Документ рецепта'
+        verbose_name_plural = 'Документы рецептов'
+
+    def __str__(self):
+        return f'{self.recipe}'
+
+
 class CommonDataAbstractModel(models.Model):
     user = models.ForeignKey(
         User,
@@ -217,3 +339,90 @@ class ShoppingList(CommonDataAbstractModel):
 
     def __str__(self):
         return f'{self.recipe} {self.user}'
+
+
+class DataVersion(models.Model):
+    name = models.CharField(
+        'Название',
+        max_length=SLUG_NAME_LENGTH,
+        primary_key=True
+    )
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.name} {self.version}'
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_user_pub_date_idx'),
+            models.Index(fields=['user', 'author'],
+                         name='feed_user_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.recipe}'
+
+
+class ShoppingCartItem(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        related_name='cart_items',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField('Количество')
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_cart_item'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} {self.ingredient}'
@@ -0,0 +1,66 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from recipe import cart, feed
+from recipe.counters import change_counter
+from recipe.models import FavoritesList, FeedEntry, Recipe, Subscription
+from users.models import User
+
+
+@receiver(post_save, sender=FavoritesList)
+def favorite_added(instance, created, **kwargs):
+    if created:
+        change_counter(Recipe, [instance.recipe_id], 'favorites_count', 1)
+
+
+@receiver(post_delete, sender=FavoritesList)
+def favorite_removed(instance, **kwargs):
+    change_counter(Recipe, [instance.recipe_id], 'favorites_count', -1)
+
+
+@receiver(pre_save, sender=Recipe)
+def recipe_saving(instance, **kwargs):
+    """Новая картинка ставится в очередь process_images."""
+    image = instance.image.name or ''
+    if (instance._state.adding
+            or image != getattr(instance, 'loaded_image', image)):
+        instance.image_pending = bool(image)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, **kwargs):
+    loaded_author_id = getattr(instance, 'loaded_author_id', None)
+    if created:
+        change_counter(User, [instance.author_id], 'recipes_count', 1)
+        feed.fan_out(instance)
+    elif loaded_author_id and loaded_author_id != instance.author_id:
+        change_counter(User, [loaded_author_id], 'recipes_count', -1)
+        change_counter(User, [instance.author_id], 'recipes_count', 1)
+        FeedEntry.objects.filter(recipe=instance).delete()
+        feed.fan_out(instance)
+    instance.loaded_author_id = instance.author_id
+    instance.loaded_image = instance.image.name or ''
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(instance, **kwargs):
+    cart.recipe_deleted(instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    change_counter(User, [instance.author_id], 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_added(instance, created, **kwargs):
+    if created:
+        change_counter(User, [instance.author_id], 'followers_count', 1)
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_removed(instance, **kwargs):
+    change_counter(User, [instance.author_id], 'followers_count', -1)
+    feed.remove(instance.user_id, instance.author_id)
+    feed.below_limit(instance.author_id)
@@ -0,0 +1,38 @@
+from django.db.models import F
+from django.utils import timezone
+from recipe.models import DataVersion
+
+RECIPES = 'recipes'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+
+
+def user_version(user_id):
+    """Версия избранного, списка покупок и подписок пользователя."""
+    return f'user-{user_id}'
+
+
+def bump_versions(*names):
+    """Увеличивает версии данных для условных запросов."""
+    now = timezone.now()
+    updated = DataVersion.objects.filter(name__in=names).update(
+        version=F('version') + 1, updated=now)
+    if updated < len(names):
+        DataVersion.objects.bulk_create(
+            [DataVersion(name=name, version=1, updated=now)
+             for name in names],
+            ignore_conflicts=True
+        )
+
+
+def get_versions(names):
+    """Версии и наибольшая дата изменения для списка названий."""
+    rows = {
+        name: (version, updated)
+        for name, version, updated in DataVersion.objects.filter(
+            name__in=names).values_list('name', 'version', 'updated')
+    }
+    versions = [rows.get(name, (0, None))[0] for name in names]
+    last_modified = max(
+        (updated for _, updated in rows.values()), default=None)
+    return versions, last_modified
@@ -0,0 +1,59 @@
+from contextlib import contextmanager
+
+import pytest
+from api.budgets import create_budget_data
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    """Загруженные в тестах картинки не попадают в media проекта."""
+    settings.MEDIA_ROOT = tmp_path / 'media'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Контекстный менеджер: блок делает не больше budget SQL-запросов."""
+    @contextmanager
+    def check(budget):
+        with CaptureQueriesContext(connection) as queries:
+            yield queries
+        assert len(queries) <= budget, (
+            f'{len(queries)} запросов при бюджете {budget}:\n'
+            + '\n'.join(query['sql'] for query in queries.captured_queries)
+        )
+    return check
+
+
+@pytest.fixture
+def budget_data(db):
+    """Пользователи по ролям и id тестовых данных из api.budgets."""
+    return create_budget_data()
+
+
+@pytest.fixture
+def clients(budget_data):
+    """Клиенты по ролям: None - аноним, token - вход по токену."""
+    users, _ = budget_data
+    clients = {None: APIClient()}
+    for key, user in users.items():
+        clients[key] = APIClient()
+        clients[key].force_authenticate(user)
+    clients['token'] = APIClient()
+    clients['token'].credentials(HTTP_AUTHORIZATION=(
+        f'Token {Token.objects.create(user=users["reader"]).key}'))
+    clients['admin_site'] = Client()
+    clients['admin_site'].force_login(users['admin'])
+    return clients
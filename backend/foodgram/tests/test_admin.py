@@ -0,0 +1,53 @@
+import pytest
+from recipe.models import Recipe, RecipeIngredients
+from users.models import User
+
+# Запросы страницы списка админки: сессия, пользователь, выборка строк
+# и связанных данных, фильтры. От числа строк на странице не зависят.
+RECIPE_CHANGELIST_QUERIES = 7
+USER_CHANGELIST_QUERIES = 5
+
+
+def add_recipes(count):
+    source = Recipe.objects.first()
+    for number in range(count):
+        recipe = Recipe.objects.create(
+            author=source.author, name=f'Бюджет админка {number}',
+            text='Описание', cooking_time=5)
+        recipe.tags.set(source.tags.all())
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(recipe=recipe, ingredients_id=row.ingredients_id,
+                              amount=row.amount)
+            for row in source.recipeingredients.all()
+        ])
+
+
+def add_users(count):
+    User.objects.bulk_create([
+        User(username=f'budget_list_{number}',
+             email=f'budget_list_{number}@example.com')
+        for number in range(count)
+    ])
+
+
+@pytest.mark.parametrize('path, budget, add_rows', (
+    ('/admin/recipe/recipe/', RECIPE_CHANGELIST_QUERIES, add_recipes),
+    ('/admin/recipe/recipe/?q=Бюджет', RECIPE_CHANGELIST_QUERIES,
+     add_recipes),
+    ('/admin/recipe/recipe/?tags__id__exact={tag}',
+     RECIPE_CHANGELIST_QUERIES, add_recipes),
+    ('/admin/users/user/', USER_CHANGELIST_QUERIES, add_users),
+    ('/admin/users/user/?q=budget', USER_CHANGELIST_QUERIES, add_users),
+), ids=('recipes', 'recipes search', 'recipes tag filter', 'users',
+        'users search'))
+def test_changelist_queries(clients, budget_data, assert_max_queries,
+                            path, budget, add_rows):
+    path = path.format(**budget_data[1])
+    client = clients['admin_site']
+    with assert_max_queries(budget) as small:
+        assert client.get(path).status_code == 200
+    add_rows(30)
+    with assert_max_queries(budget) as large:
+        response = client.get(path)
+    assert response.status_code == 200
+    assert len(large) == len(small)
@@ -0,0 +1,56 @@
+import pytest
+from api.authentication import CachedTokenAuthentication, token_cache_key
+from django.core.cache import cache
+from recipe.counters import change_counter
+from rest_framework.authtoken.models import Token
+from users.models import User
+
+
+@pytest.fixture
+def shared_cache(settings, tmp_path):
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path / 'cache'),
+    }}
+
+
+@pytest.fixture
+def reader_token(clients, budget_data):
+    users, _ = budget_data
+    return Token.objects.get(user=users['reader']).key
+
+
+def test_token_cached_in_shared_cache(shared_cache, clients, reader_token):
+    assert clients['token'].get('/api/users/me/').status_code == 200
+    assert cache.get(token_cache_key(reader_token)) is not None
+    assert clients['token'].post(
+        '/api/auth/token/logout/').status_code == 204
+    assert cache.get(token_cache_key(reader_token)) is None
+    assert clients['token'].get('/api/users/me/').status_code == 401
+
+
+def test_token_not_cached_in_local_cache(settings, clients, reader_token):
+    """Локальный кэш не очистился бы в других процессах при выходе."""
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    assert clients['token'].get('/api/users/me/').status_code == 200
+    assert cache.get(token_cache_key(reader_token)) is None
+
+
+def test_cached_user_counters_are_fresh(shared_cache, budget_data,
+                                        reader_token):
+    """Счетчики пользователя из кэша читаются из базы и не затираются."""
+    users, _ = budget_data
+    counters = User.objects.filter(id=users['reader'].id).values_list(
+        'recipes_count', 'followers_count')
+    recipes, followers = counters.get()
+    authentication = CachedTokenAuthentication()
+    authentication.authenticate_credentials(reader_token)
+    change_counter(User, [users['reader'].id], 'recipes_count', 5)
+    user, _ = authentication.authenticate_credentials(reader_token)
+    assert user.recipes_count == recipes + 5
+    change_counter(User, [users['reader'].id], 'followers_count', 1)
+    user, _ = authentication.authenticate_credentials(reader_token)
+    user.first_name = 'Новое имя'
+    user.save()
+    assert counters.get() == (recipes + 5, followers + 1)
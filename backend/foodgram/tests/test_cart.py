@@ -0,0 +1,66 @@
+from collections import Counter
+
+import pytest
+from recipe.models import RecipeIngredients, ShoppingCartItem, ShoppingList
+
+
+def expected_carts():
+    totals = Counter()
+    for user_id, recipe_id in ShoppingList.objects.values_list(
+            'user_id', 'recipe_id'):
+        for ingredient_id, amount in RecipeIngredients.objects.filter(
+                recipe_id=recipe_id).values_list('ingredients_id', 'amount'):
+            totals[user_id, ingredient_id] += amount
+    return {key: amount for key, amount in totals.items() if amount}
+
+
+def stored_carts():
+    return {
+        (user_id, ingredient_id): amount
+        for user_id, ingredient_id, amount in (
+            ShoppingCartItem.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'))
+    }
+
+
+@pytest.fixture
+def cart_row(budget_data):
+    """Строка ингредиентов рецепта, который есть в списках покупок."""
+    users, _ = budget_data
+    recipe_id = ShoppingList.objects.filter(
+        user=users['reader']).values_list('recipe_id', flat=True).first()
+    return RecipeIngredients.objects.filter(recipe_id=recipe_id).first()
+
+
+def test_admin_change_updates_carts(clients, cart_row):
+    response = clients['admin_site'].post(
+        f'/admin/recipe/recipeingredients/{cart_row.id}/change/', {
+            'recipe': cart_row.recipe_id,
+            'ingredients': cart_row.ingredients_id,
+            'amount': cart_row.amount + 7,
+        })
+    assert response.status_code == 302
+    assert stored_carts() == expected_carts()
+
+
+def test_admin_delete_updates_carts(clients, cart_row):
+    response = clients['admin_site'].post(
+        f'/admin/recipe/recipeingredients/{cart_row.id}/delete/',
+        {'post': 'yes'})
+    assert response.status_code == 302
+    assert stored_carts() == expected_carts()
+
+
+def test_admin_bulk_delete_updates_carts(clients, budget_data):
+    users, _ = budget_data
+    rows = RecipeIngredients.objects.filter(
+        recipe__shoppinglist__user=users['reader']).values_list(
+            'id', flat=True)[:3]
+    response = clients['admin_site'].post(
+        '/admin/recipe/recipeingredients/', {
+            'action': 'delete_selected',
+            '_selected_action': list(rows),
+            'post': 'yes',
+        })
+    assert response.status_code == 302
+    assert stored_carts() == expected_carts()
@@ -0,0 +1,118 @@
+import json
+from io import BytesIO
+
+import pytest
+from api.documents import document_data
+from api.serializers import RecipeCreateSerializer
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from recipe.images import process_recipe_image
+from recipe.models import (Ingredients, Recipe, RecipeDocument,
+                           RecipeIngredients, Tags)
+
+
+@pytest.mark.parametrize('path', ('/api/recipes/', '/api/recipes/{recipe}/'))
+def test_lazy_rebuild_keeps_etag(clients, budget_data, path):
+    """Досборка документов при чтении не делает ETag ответа устаревшим."""
+    path = path.format(**budget_data[1])
+    assert not RecipeDocument.objects.exists()
+    response = clients['reader'].get(path)
+    assert response.status_code == 200
+    assert RecipeDocument.objects.exists()
+    response = clients['reader'].get(
+        path, HTTP_IF_NONE_MATCH=response['ETag'])
+    assert response.status_code == 304
+
+
+def png(color):
+    buffer = BytesIO()
+    Image.new('RGB', (64, 48), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+@pytest.fixture
+def document_recipes(budget_data):
+    """Рецепты с картинками и вариантами, без картинки, без описания
+    и с ингредиентами, добавленными не по порядку названий."""
+    users, fixture = budget_data
+    author = users['author']
+    author.first_name = ''
+    author.last_name = 'Без имени'
+    author.save()
+    tags = list(Tags.objects.all())
+    ingredients = list(Ingredients.objects.order_by('-name'))
+    with_variants = Recipe.objects.create(
+        author=author, name='С вариантами', text='Текст', cooking_time=3)
+    with_variants.image.save('with_variants.png', png('red'))
+    process_recipe_image(with_variants)
+    stale = Recipe.objects.create(
+        author=author, name='Со старыми вариантами', text='Текст',
+        cooking_time=4)
+    stale.image.save('stale_old.png', png('green'))
+    process_recipe_image(stale)
+    stale.image.save('stale_new.png', png('blue'))
+    pending = Recipe.objects.create(
+        author=author, name='Без вариантов', text='Текст', cooking_time=5)
+    pending.image.save('pending.png', png('white'))
+    empty = Recipe.objects.create(
+        author=users['other'], name='Пустой', text=None, cooking_time=None)
+    for number, recipe in enumerate((with_variants, stale, pending, empty)):
+        recipe.tags.set(tags[number % len(tags):])
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(recipe=recipe, ingredients=ingredient,
+                              amount=number + index + 1)
+            for index, ingredient in enumerate(ingredients[number:])
+        ])
+    return Recipe.objects.values_list('id', flat=True)
+
+
+def test_document_parity(document_recipes):
+    """Документы из values() совпадают с ответом RecipeCreateSerializer.
+
+    Сравниваются строки JSON, поэтому важен и порядок ключей и строк.
+    """
+    documents = document_data(list(document_recipes))
+    assert len(documents) == len(document_recipes)
+    for recipe_id in document_recipes:
+        recipe = Recipe.objects.select_related('author').get(id=recipe_id)
+        expected = RecipeCreateSerializer().to_representation(recipe)
+        assert json.dumps(documents[recipe_id], ensure_ascii=False) == (
+            json.dumps(expected, ensure_ascii=False)), recipe.name
+
+
+def test_representation_orders_related_rows(document_recipes):
+    """Порядок связанных строк задан запросом, а не порядком в таблице."""
+    recipe = Recipe.objects.select_related('author').get(
+        name='С вариантами')
+    with CaptureQueriesContext(connection) as captured:
+        RecipeCreateSerializer().to_representation(recipe)
+    unordered = [query['sql'] for query in captured.captured_queries
+                 if 'ORDER BY' not in query['sql']]
+    assert unordered == []
+
+
+def test_variants_in_documents(document_recipes):
+    documents = document_data(list(document_recipes))
+    by_name = {data['name']: data for data in documents.values()}
+    assert set(by_name['С вариантами']['images']) == {'card', 'detail'}
+    assert by_name['Со старыми вариантами']['images'] == {}
+    assert by_name['Пустой']['image'] is None
+    assert by_name['Пустой']['text'] is None
+
+
+def test_created_recipe_matches_document(clients, budget_data):
+    """Ответ на создание рецепта совпадает с тем, что потом отдает GET."""
+    _, fixture = budget_data
+    response = clients['author'].post('/api/recipes/', {
+        'name': 'Через API',
+        'text': 'Описание',
+        'cooking_time': 7,
+        'tags': [fixture['tag']],
+        'ingredients': [{'id': fixture['ingredient'], 'amount': 4}],
+    }, format='json')
+    assert response.status_code == 201
+    created = json.loads(response.content)
+    response = clients['author'].get(f'/api/recipes/{created["id"]}/')
+    assert json.loads(response.content) == created
@@ -0,0 +1,73 @@
+import pytest
+from recipe.models import FeedEntry, Recipe
+
+
+def read_feed(client, limit):
+    ids = []
+    url = f'/api/recipes/feed/?limit={limit}'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        ids += [recipe['id'] for recipe in response.data['results']]
+        url = response.data['next']
+    return ids
+
+
+def publish(client, fixture, name):
+    response = client.post('/api/recipes/', {
+        'name': name,
+        'text': 'Описание',
+        'cooking_time': 5,
+        'tags': [fixture['tag']],
+        'ingredients': [{'id': fixture['ingredient'], 'amount': 1}],
+    }, format='json')
+    assert response.status_code == 201
+    return response.data['id']
+
+
+@pytest.mark.parametrize('fanout_limit', (1000, 2), ids=(
+    'fan-out', 'celebrity author'))
+def test_feed_pages(settings, clients, budget_data, fanout_limit):
+    """Лента по курсору отдает все рецепты подписок по дате без повторов.
+
+    При FEED_FANOUT_LIMIT = 2 один из авторов читается напрямую из
+    рецептов и сливается с записями ленты другого.
+    """
+    settings.FEED_FANOUT_LIMIT = fanout_limit
+    users, _ = budget_data
+    expected = list(Recipe.objects.filter(
+        author__in=(users['author'], users['other'])
+    ).order_by('-pub_date', '-id').values_list('id', flat=True))
+    assert read_feed(clients['reader'], 3) == expected
+    assert read_feed(clients['reader'], 100) == expected
+
+
+def test_feed_only_followed_authors(clients, budget_data):
+    users, _ = budget_data
+    expected = list(Recipe.objects.filter(
+        author=users['other']).order_by('-pub_date', '-id').values_list(
+            'id', flat=True))
+    assert read_feed(clients['admin'], 5) == expected
+
+
+def test_feed_crosses_fanout_limit(settings, clients, budget_data):
+    """Рецепты автора не пропадают из лент при переходе через порог.
+
+    Выше порога рецепт не раскладывается по лентам, после отписки
+    ниже порога ленты заполняются заново. Решение о раскладке не
+    зависит от устаревшего счетчика у объекта автора.
+    """
+    settings.FEED_FANOUT_LIMIT = 2
+    users, fixture = budget_data
+    subscribe = f'/api/users/{fixture["author"]}/subscribe/'
+    assert clients['admin'].post(subscribe).status_code == 201
+    above = publish(clients['author'], fixture, 'Выше порога')
+    assert not FeedEntry.objects.filter(recipe_id=above).exists()
+    assert above in read_feed(clients['reader'], 100)
+    assert above in read_feed(clients['admin'], 100)
+    assert clients['admin'].delete(subscribe).status_code == 204
+    assert above in read_feed(clients['reader'], 100)
+    assert above not in read_feed(clients['admin'], 100)
+    users['author'].followers_count = settings.FEED_FANOUT_LIMIT
+    below = publish(clients['author'], fixture, 'Ниже порога')
+    assert read_feed(clients['reader'], 100)[:2] == [below, above]
@@ -0,0 +1,47 @@
+import pytest
+from recipe.models import Recipe
+
+
+def read_pages(client, path, limit):
+    ids = []
+    counts = set()
+    offset = 0
+    while True:
+        response = client.get(f'{path}&limit={limit}&offset={offset}')
+        assert response.status_code == 200
+        counts.add(response.data['count'])
+        page = [recipe['id'] for recipe in response.data['results']]
+        if not page:
+            return ids, counts
+        ids += page
+        offset += limit
+
+
+@pytest.mark.parametrize('slugs', (
+    ('budget-0',),
+    ('budget-0', 'budget-1'),
+    ('budget-0', 'budget-1', 'budget-2'),
+))
+def test_several_tags(clients, budget_data, slugs):
+    """Рецепт с несколькими выбранными тегами попадает в выдачу один раз."""
+    expected = set(Recipe.objects.filter(
+        tags__slug__in=slugs).values_list('id', flat=True))
+    path = '/api/recipes/?' + '&'.join(f'tags={slug}' for slug in slugs)
+    ids, counts = read_pages(clients['reader'], path, 4)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == expected
+    assert counts == {len(expected)}
+
+
+def test_several_tags_with_lists(clients, budget_data):
+    users, _ = budget_data
+    expected = set(Recipe.objects.filter(
+        tags__slug__in=('budget-1', 'budget-2'),
+        favoriteslist__user=users['reader']
+    ).values_list('id', flat=True))
+    ids, counts = read_pages(
+        clients['reader'],
+        '/api/recipes/?tags=budget-1&tags=budget-2&is_favorited=1', 3)
+    assert len(ids) == len(set(ids))
+    assert set(ids) == expected
+    assert counts == {len(expected)}
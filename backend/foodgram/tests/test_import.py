@@ -0,0 +1,78 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from recipe.feed import rebuild_feed
+from recipe.models import FeedEntry, Recipe, RecipeIngredients
+
+RECIPE = {
+    'text': 'Импорт',
+    'cooking_time': 5,
+    'pub_date': '2030-01-01T12:00:00+00:00',
+    'image': None,
+    'tags': [{'name': 'Бюджет 0', 'color': '#000000', 'slug': 'budget-0'}],
+    'ingredients': [{'name': 'бюджетный ингредиент 0',
+                     'measurement_units': 'г', 'amount': 3}],
+}
+
+
+def feed_state():
+    return set(FeedEntry.objects.values_list(
+        'user_id', 'recipe_id', 'author_id', 'pub_date'))
+
+
+def import_records(tmp_path, records):
+    path = tmp_path / 'recipes.ndjson'
+    path.write_text(''.join(
+        json.dumps(record, ensure_ascii=False) + '\n' for record in records
+    ), encoding='utf-8')
+    call_command('import_recipes', str(path), stdout=StringIO())
+
+
+def test_import_updates_feeds_of_new_and_moved_recipes(
+        tmp_path, budget_data):
+    users, fixture = budget_data
+    moved = Recipe.objects.get(id=fixture['own_recipe'])
+    import_records(tmp_path, [
+        {**RECIPE, 'name': 'Новый импортированный', 'author': 'budget_other'},
+        {**RECIPE, 'name': moved.name, 'author': 'budget_other'},
+    ])
+    created = Recipe.objects.get(name='Новый импортированный')
+    moved.refresh_from_db()
+    assert moved.author == users['other']
+    assert list(RecipeIngredients.objects.filter(
+        recipe=moved).values_list('amount', flat=True)) == [3]
+    imported = feed_state()
+    assert {(user_id, recipe_id) for user_id, recipe_id, _, _ in imported
+            if recipe_id in (created.id, moved.id)} == {
+        (users['reader'].id, created.id), (users['admin'].id, created.id),
+        (users['reader'].id, moved.id), (users['admin'].id, moved.id),
+    }
+    rebuild_feed()
+    assert imported == feed_state()
+
+
+def test_import_moves_feed_entries_without_new_recipes(
+        tmp_path, budget_data):
+    users, fixture = budget_data
+    moved = Recipe.objects.get(id=fixture['own_recipe'])
+    assert FeedEntry.objects.filter(
+        recipe=moved, author=users['author']).exists()
+    import_records(tmp_path, [
+        {**RECIPE, 'name': moved.name, 'author': 'budget_other'}])
+    assert set(FeedEntry.objects.filter(recipe=moved).values_list(
+        'user_id', 'author_id')) == {
+            (users['reader'].id, users['other'].id),
+            (users['admin'].id, users['other'].id)}
+    imported = feed_state()
+    rebuild_feed()
+    assert imported == feed_state()
+
+
+def test_import_does_not_rebuild_other_feeds(tmp_path, budget_data):
+    """Импорт добавляет в ленты только свои рецепты."""
+    users, fixture = budget_data
+    FeedEntry.objects.filter(recipe_id=fixture['recipe']).delete()
+    import_records(tmp_path, [
+        {**RECIPE, 'name': 'Новый импортированный', 'author': 'budget_other'}])
+    assert not FeedEntry.objects.filter(recipe_id=fixture['recipe']).exists()
@@ -0,0 +1,29 @@
+from api.ingredient_index import ingredient_index
+from recipe.models import Ingredients
+from recipe.versions import INGREDIENTS, bump_versions
+
+
+def test_ingredients_etag_follows_version(clients, budget_data):
+    """ETag списка ингредиентов один для всех процессов.
+
+    Изменение из другого процесса не сбрасывает индекс этого процесса,
+    но повышает версию INGREDIENTS, и индекс перестраивается по ней.
+    """
+    client = clients[None]
+    response = client.get('/api/ingredients/?name=бюдж')
+    etag = response['ETag']
+    assert response.has_header('Last-Modified')
+    ingredient_index.invalidate()
+    assert client.get('/api/ingredients/?name=бюдж')['ETag'] == etag
+    assert client.get(
+        '/api/ingredients/?name=бюдж',
+        HTTP_IF_NONE_MATCH=etag).status_code == 304
+    Ingredients.objects.filter(id=budget_data[1]['ingredient']).update(
+        name='бюджетный ингредиент новый')
+    bump_versions(INGREDIENTS)
+    response = client.get(
+        '/api/ingredients/?name=бюдж', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+    assert 'бюджетный ингредиент новый' in [
+        item['name'] for item in response.data]
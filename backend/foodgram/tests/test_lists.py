@@ -0,0 +1,46 @@
+import pytest
+from django.db.models import Count
+from recipe import lists
+from recipe.models import FavoritesList, Recipe
+from tests.test_cart import expected_carts, stored_carts
+
+
+def favorites_drift():
+    """Рецепты, у которых favorites_count не равен числу записей."""
+    return {
+        recipe.id: (recipe.favorites_count, recipe.actual)
+        for recipe in Recipe.objects.annotate(actual=Count('favoriteslist'))
+        if recipe.favorites_count != recipe.actual
+    }
+
+
+@pytest.mark.parametrize('method', ('post', 'delete'))
+@pytest.mark.parametrize('url', (
+    '/api/recipes/favorite/batch/', '/api/recipes/shopping_cart/batch/'))
+def test_batch_keeps_counters_and_carts(clients, budget_data, method, url):
+    _, fixture = budget_data
+    recipes = [fixture['recipe'], fixture['listed_recipe'],
+               fixture['own_recipe']]
+    response = getattr(clients['admin'], method)(
+        url, {'recipes': recipes}, format='json')
+    assert response.status_code == 200
+    assert favorites_drift() == {}
+    assert stored_carts() == expected_carts()
+
+
+def test_concurrent_insert_is_not_counted_twice(
+        clients, budget_data, monkeypatch):
+    """Строка, вставленная параллельно после проверки, не считается дважды.
+
+    split_recipes подменяется так, будто строки пользователя еще нет,
+    хотя она уже вставлена.
+    """
+    users, fixture = budget_data
+    recipe_id = fixture['listed_recipe']
+    assert FavoritesList.objects.filter(
+        user=users['admin'], recipe_id=recipe_id).exists()
+    monkeypatch.setattr(
+        lists, 'split_recipes',
+        lambda model, user_id, recipe_ids: (set(recipe_ids), set()))
+    lists.add_recipes(FavoritesList, users['admin'].id, [recipe_id])
+    assert favorites_drift() == {}
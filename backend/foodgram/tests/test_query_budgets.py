@@ -0,0 +1,72 @@
+import pytest
+from api.budgets import READ_BUDGETS, WRITE_BUDGETS, fill
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipe.models import Recipe, RecipeIngredients
+
+
+def send(clients, user, method, path, data=None):
+    client = clients['admin_site'] if path.startswith('/admin/') else (
+        clients[user])
+    request = getattr(client, method)
+    response = request(path, data, format='json') if data else request(path)
+    if response.streaming:
+        b''.join(response.streaming_content)
+    return response
+
+
+@pytest.mark.parametrize(
+    'name, path, user, first, repeated', READ_BUDGETS,
+    ids=[case[0] for case in READ_BUDGETS])
+def test_read_budget(clients, budget_data, assert_max_queries,
+                     name, path, user, first, repeated):
+    path = fill(path, budget_data[1])
+    for budget in (first, repeated):
+        with assert_max_queries(budget):
+            response = send(clients, user, 'get', path)
+        assert response.status_code == 200, response.content
+
+
+@pytest.mark.parametrize(
+    'name, method, path, user, data, budget', WRITE_BUDGETS,
+    ids=[case[0] for case in WRITE_BUDGETS])
+def test_write_budget(clients, budget_data, assert_max_queries,
+                      name, method, path, user, data, budget):
+    path, data = fill((path, data), budget_data[1])
+    with assert_max_queries(budget):
+        response = send(clients, user, method, path, data)
+    assert response.status_code < 400, response.content
+
+
+def add_recipes(author, count):
+    recipe = Recipe.objects.filter(author=author).first()
+    for number in range(count):
+        extra = Recipe.objects.create(
+            author=author, name=f'Еще рецепт {number}', text='Суп',
+            cooking_time=5)
+        extra.tags.set(recipe.tags.all())
+        RecipeIngredients.objects.bulk_create([
+            RecipeIngredients(recipe=extra, ingredients_id=row.ingredients_id,
+                              amount=row.amount)
+            for row in recipe.recipeingredients.all()
+        ])
+
+
+@pytest.mark.parametrize('path', (
+    '/api/recipes/?limit=30',
+    '/api/recipes/feed/?limit=30',
+    '/api/users/subscriptions/?recipes_limit=30',
+))
+def test_queries_do_not_grow_with_page(clients, budget_data, path):
+    """Число запросов страницы не зависит от числа рецептов на ней."""
+    users, _ = budget_data
+
+    def count_queries():
+        send(clients, 'reader', 'get', path)
+        with CaptureQueriesContext(connection) as queries:
+            send(clients, 'reader', 'get', path)
+        return len(queries)
+
+    before = count_queries()
+    add_recipes(users['author'], 10)
+    assert count_queries() == before
@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import pytest
+from api.middleware import QueryTimingMiddleware, ReplicaMiddleware
+from api.replicas import primary_reads, replica_reads
+from asgiref.sync import async_to_sync, sync_to_async
+from django.apps import apps
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.http import HttpResponse
+from django.test import AsyncRequestFactory
+from recipe.models import Tags
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from users.models import User
+
+REPLICA = 'replica_1'
+
+
+@pytest.fixture
+def replica(settings, transactional_db, tmp_path):
+    """Вторая база SQLite со схемой, но без данных основной базы.
+
+    Роутер не пускает чтение на реплику внутри транзакции основной
+    базы, поэтому тесты идут без обертки в транзакцию.
+    """
+    config = {'ENGINE': 'django.db.backends.sqlite3',
+              'NAME': str(tmp_path / 'replica.sqlite3')}
+    settings.DATABASES = {**settings.DATABASES, REPLICA: config}
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': str(tmp_path / 'cache'),
+    }}
+    connections.settings[REPLICA] = config
+    with connections[REPLICA].schema_editor() as editor:
+        for model in apps.get_models():
+            if model._meta.managed and not model._meta.proxy:
+                editor.create_model(model)
+    Tags.objects.create(name='Только в основной', color='#000000',
+                        slug='primary')
+    yield REPLICA
+    connections[REPLICA].close()
+    del connections[REPLICA]
+    del connections.settings[REPLICA]
+
+
+def tag_names(client):
+    response = client.get('/api/tags/')
+    assert response.status_code == 200
+    return [tag['name'] for tag in response.data]
+
+
+def test_reads_go_to_replica(replica):
+    assert Tags.objects.count() == 1
+    with replica_reads():
+        assert Tags.objects.count() == 0
+        with primary_reads():
+            assert Tags.objects.count() == 1
+        with transaction.atomic():
+            assert Tags.objects.count() == 1
+
+
+def test_writes_go_to_primary(replica):
+    with replica_reads():
+        tag = Tags.objects.create(name='Новый', color='#FFFFFF', slug='new')
+        assert tag._state.db == DEFAULT_DB_ALIAS
+        assert Tags.objects.count() == 0
+    assert Tags.objects.count() == 2
+    assert Tags.objects.using(replica).count() == 0
+
+
+def test_write_pins_reads_to_primary(settings, replica):
+    """После изменения клиент читает из основной базы.
+
+    Закрепление держится REPLICA_PIN_SECONDS секунд и не касается
+    других клиентов.
+    """
+    settings.REPLICA_PIN_SECONDS = 1
+    user = User.objects.create_user(
+        username='pinned', email='pinned@example.com', password='password')
+    writer = APIClient()
+    writer.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+    assert tag_names(writer) == []
+    response = writer.post('/api/users/set_password/', {
+        'new_password': 'new-password-123',
+        'current_password': 'password',
+    }, format='json')
+    assert response.status_code == 204
+    assert tag_names(writer) == ['Только в основной']
+    assert tag_names(APIClient()) == []
+    time.sleep(settings.REPLICA_PIN_SECONDS + 0.1)
+    assert tag_names(writer) == []
+
+
+def test_replicas_need_shared_cache(settings, replica):
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    with pytest.raises(ImproperlyConfigured):
+        ReplicaMiddleware(HttpResponse)
+
+
+def test_middlewares_stay_async(settings, replica):
+    """Под ASGI middleware не переводит запрос в общий поток.
+
+    Чтение в пуле потоков идет с реплики и попадает в счетчик запросов.
+    """
+    settings.SQL_TIMING = True
+
+    async def view(request):
+        return HttpResponse(await sync_to_async(
+            Tags.objects.count, thread_sensitive=False)())
+
+    middleware = QueryTimingMiddleware(ReplicaMiddleware(view))
+    assert asyncio.iscoroutinefunction(middleware)
+    response = async_to_sync(middleware)(AsyncRequestFactory().get('/'))
+    assert response.content == b'0'
+    assert response['X-DB-Queries'] == '1'
@@ -10,16 +10,17 @@ class UserAdmin(admin.ModelAdmin):
                     'last_name',
                     'get_subscribtion',
                     'get_recipe')
-    list_filter = ('username', 'email')
-    show_full_result_count = True
+    list_filter = ('is_staff', 'is_active')
+    search_fields = ('username', 'email')
+    show_full_result_count = False
 
     @admin.display(description='Подписчики')
     def get_subscribtion(self, obj):
-        return obj.follower.count()
+        return obj.followers_count
 
     @admin.display(description='Рецепты')
     def get_recipe(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 admin.site.register(User, UserAdmin)
@@ -39,6 +39,16 @@ class User(AbstractUser):
         related_name='is_following',
         symmetrical=False,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Рецепты',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        'Подписчики',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('username',)